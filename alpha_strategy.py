@@ -6,6 +6,48 @@ import pandas as pd
 import numpy as np
 from typing import Optional
 
+# bottleneck為可選加速套件：move_mean是C實作的滑動平均，比pandas rolling快數倍
+try:
+    import bottleneck as bn
+except ImportError:
+    bn = None
+
+# numba為可選加速套件：缺少時njit退化為no-op裝飾器，
+# 函數改以純Python執行（在NumPy陣列上迭代仍遠快於逐格.iloc）
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrapper(func):
+            return func
+        return wrapper
+
+
+@njit(cache=True)
+def _atr_wilder_loop(tr: np.ndarray, n: int) -> np.ndarray:
+    """Wilder ATR遞迴：acc = (acc*(n-1) + tr[i]) / n
+
+    與ewm(alpha=1/n, adjust=False)數值等價；抽成模組層函數
+    讓numba能編譯這段無法用單一pandas呼叫表達的遞迴。
+    """
+    out = np.empty_like(tr)
+    acc = tr[0]
+    out[0] = acc
+    for i in range(1, len(tr)):
+        acc = (acc * (n - 1) + tr[i]) / n
+        out[i] = acc
+    return out
+
+
+def _move_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """滑動平均：有bottleneck時走C實作，否則退回pandas rolling"""
+    if bn is not None:
+        return bn.move_mean(values, window=window, min_count=window)
+    return pd.Series(values).rolling(window=window).mean().to_numpy()
+
 
 class AlphaStrategy:
     """
@@ -64,24 +106,33 @@ class AlphaStrategy:
             加入技術指標後的DataFrame
         """
         df = df.copy()
-        
+
+        # 先一次取出NumPy陣列，後續計算不再經過pandas的逐欄調度
+        close = df['Close'].to_numpy(dtype=np.float64)
+        high = df['High'].to_numpy(dtype=np.float64)
+        low = df['Low'].to_numpy(dtype=np.float64)
+        volume = df['Volume'].to_numpy(dtype=np.float64)
+
         # 計算移動平均線
-        df['MA20'] = df['Close'].rolling(window=self.ma_short).mean()
-        df['MA60'] = df['Close'].rolling(window=self.ma_long).mean()
-        
+        df['MA20'] = _move_mean(close, self.ma_short)
+        df['MA60'] = _move_mean(close, self.ma_long)
+
         # 計算成交量移動平均
-        df['MA5_Vol'] = df['Volume'].rolling(window=self.vol_ma_period).mean()
-        
+        df['MA5_Vol'] = _move_mean(volume, self.vol_ma_period)
+
         # 計算ATR (Average True Range)
-        df['High_Low'] = df['High'] - df['Low']
-        df['High_Close'] = abs(df['High'] - df['Close'].shift(1))
-        df['Low_Close'] = abs(df['Low'] - df['Close'].shift(1))
-        df['True_Range'] = df[['High_Low', 'High_Close', 'Low_Close']].max(axis=1)
-        df['ATR'] = df['True_Range'].rolling(window=self.atr_period).mean()
-        
-        # 清理臨時欄位
-        df.drop(['High_Low', 'High_Close', 'Low_Close', 'True_Range'], axis=1, inplace=True)
-        
+        # True Range直接在陣列上計算，不再建立臨時欄位再drop
+        # np.fmax會忽略NaN，與原先DataFrame.max(axis=1)的行為一致
+        prev_close = np.empty_like(close)
+        prev_close[0] = np.nan
+        prev_close[1:] = close[:-1]
+        true_range = np.fmax(
+            np.fmax(high - low, np.abs(high - prev_close)),
+            np.abs(low - prev_close)
+        )
+        # Wilder平滑遞迴交給可JIT的模組層迴圈，與bundle路徑的ewm等價
+        df['ATR'] = _atr_wilder_loop(true_range, self.atr_period)
+
         return df
     
     def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -148,6 +199,67 @@ class AlphaStrategy:
         
         return df
     
+    def calculate_indicators_bundle(self, data_dict: dict) -> pd.DataFrame:
+        """計算多支股票的技術指標（長表向量化版本）
+
+        把所有股票串成MultiIndex(Stock_ID, Date)長表，指標改用
+        groupby transform一次算完，免去逐股呼叫calculate_indicators
+        的Python層與pandas調度開銷。
+
+        Parameters:
+        -----------
+        data_dict : dict
+            以股票代號為key、OHLCV DataFrame為value的字典
+
+        Returns:
+        --------
+        pd.DataFrame
+            含指標欄位的MultiIndex(Stock_ID, Date) DataFrame
+        """
+        bundle = pd.concat(data_dict, names=['Stock_ID', 'Date'], copy=False, sort=False)
+
+        # 指標：逐股分組後以transform批次計算
+        close_by_stock = bundle.groupby(level='Stock_ID')['Close']
+        bundle['MA20'] = close_by_stock.transform(
+            lambda s: s.rolling(window=self.ma_short).mean())
+        bundle['MA60'] = close_by_stock.transform(
+            lambda s: s.rolling(window=self.ma_long).mean())
+        bundle['MA5_Vol'] = bundle.groupby(level='Stock_ID')['Volume'].transform(
+            lambda s: s.rolling(window=self.vol_ma_period).mean())
+
+        # ATR：True Range向量化；前日收盤逐股shift，避免跨股汙染
+        prev_close = close_by_stock.shift(1)
+        true_range = np.fmax(
+            np.fmax(
+                (bundle['High'] - bundle['Low']).to_numpy(),
+                np.abs(bundle['High'].to_numpy() - prev_close.to_numpy())
+            ),
+            np.abs(bundle['Low'].to_numpy() - prev_close.to_numpy())
+        )
+        # Wilder平滑（ewm alpha=1/n, adjust=False）：一條C層遞迴
+        # 取代逐日Python迴圈，也比單純SMA更貼近標準ATR定義
+        tr_series = pd.Series(true_range, index=bundle.index)
+        bundle['ATR'] = tr_series.groupby(level='Stock_ID').transform(
+            lambda s: s.ewm(alpha=1.0 / self.atr_period, adjust=False).mean())
+
+        return bundle
+
+    def analyze_bundle(self, data_dict: dict) -> pd.DataFrame:
+        """一次分析多支股票：長表指標 + 信號
+
+        Parameters:
+        -----------
+        data_dict : dict
+            以股票代號為key、OHLCV DataFrame為value的字典
+
+        Returns:
+        --------
+        pd.DataFrame
+            含所有指標與信號欄位的MultiIndex(Stock_ID, Date) DataFrame
+        """
+        # 信號條件都是逐bar運算，直接沿用單股的向量化路徑
+        return self.generate_signals(self.calculate_indicators_bundle(data_dict))
+
     def analyze_stock(self, df: pd.DataFrame, stock_id: Optional[str] = None) -> pd.DataFrame:
         """
         完整分析單支股票
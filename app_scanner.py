@@ -9,6 +9,8 @@ from datetime import datetime
 from stock_scanner import TaiwanStockScanner
 import threading
 import time
+import gzip
+import io
 
 # 頁面配置
 st.set_page_config(
@@ -18,6 +20,118 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# orjson為可選加速套件：在C層直接序列化numpy型別，比stdlib json快3-10倍
+try:
+    import orjson
+except ImportError:
+    orjson = None
+import json
+
+# pyarrow為可選加速套件：to_pylist()一次C++掃描就回傳JSON乾淨的Python型別
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# 模組層建立一次連線池Session：重複發送webhook時沿用keep-alive連線，
+# 省掉每次POST的TCP+TLS握手，並內建重試
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    _SESSION = requests.Session()
+    _SESSION.mount('https://', HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=4,
+        max_retries=Retry(total=3, backoff_factor=0.3,
+                          status_forcelist=(429, 500, 502, 503, 504))
+    ))
+except ImportError:
+    requests = None
+    _SESSION = None
+
+
+# 上次掃描結果的顯示欄位（模組層常數，避免每次rerun重建清單）
+# 主掃描流程的列名（優先）
+MAIN_DISPLAY_COLS = pd.Index([
+    '族群', '股票代碼', '股票名稱', '當前股價', 'MA5', 'MA20', 'MA50', 'MA60', 'MA200',
+    '策略評分', '買入訊號', '波段狀態', '建議持有天數',
+    '建議停損價(ATR)', '移動停損價', '建議停利價'
+])
+# 舊版本的列名（後備）
+OLD_DISPLAY_COLS = pd.Index([
+    'Stock_ID', '族群', 'Total_Score', 'Close', 'Trend_Score',
+    'Momentum_Score', 'RS_Score', 'Stop_Loss_Price', 'Risk_Percent'
+])
+
+
+def _df_to_jsonable_records(df: pd.DataFrame) -> list:
+    """將DataFrame逐欄轉換為JSON可序列化的records清單"""
+    # 有pyarrow時走單次C++轉換：缺失值直接變None、Timestamp變datetime
+    if pa is not None:
+        try:
+            return pa.Table.from_pandas(df, preserve_index=False).to_pylist()
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass  # 混合型別欄位轉換失敗時退回逐欄清理
+
+    # 用select_dtypes一次把欄位分桶，取代逐欄的dtype檢查階梯
+    dt_cols = set(df.select_dtypes(include=['datetime', 'datetimetz']).columns)
+    num_cols = set(df.select_dtypes(include='number').columns)
+
+    columns_json = {}
+    for col in df.columns:
+        s = df[col]
+        # 將Timestamp欄位轉換為字符串
+        if col in dt_cols:
+            columns_json[col] = s.astype(str).tolist()
+        # 數值欄位：tolist()會轉成Python原生數值，NaN再換成None
+        elif col in num_cols:
+            columns_json[col] = [None if pd.isna(v) else v for v in s.tolist()]
+        # 其他欄位：處理殘留的Timestamp/缺失值
+        else:
+            columns_json[col] = [
+                None if pd.isna(v) else (str(v) if isinstance(v, (pd.Timestamp, pd.Timedelta)) else v)
+                for v in s.tolist()
+            ]
+    return [dict(zip(columns_json, row)) for row in zip(*columns_json.values())]
+
+
+def _build_payload(df: pd.DataFrame) -> dict:
+    """組裝要發送到自動化系統的payload（時間戳+掃描結果）
+
+    有orjson時直接用to_dict('records')，numpy型別交給C層序列化；
+    否則退回逐欄的Python層清理。
+    """
+    if orjson is not None:
+        records = df.to_dict(orient='records')
+    else:
+        records = _df_to_jsonable_records(df)
+    return {
+        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "data": records
+    }
+
+
+def _make_csv_bytes(df: pd.DataFrame) -> bytes:
+    """輸出帶UTF-8 BOM的CSV bytes
+
+    直接寫進BytesIO並預置BOM，省掉to_csv(encoding='utf-8-sig')回傳str
+    後Streamlit再重新編碼一次的來回轉碼。
+    """
+    buf = io.BytesIO()
+    buf.write(b'\xef\xbb\xbf')
+    df.to_csv(buf, index=False, encoding='utf-8', lineterminator='\n')
+    return buf.getvalue()
+
+
+def _encode_payload(payload: dict) -> bytes:
+    """將payload編碼為JSON bytes（一次C層編碼，取代requests內部的stdlib json）"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY, default=str)
+    return json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+
+
 # 初始化session state
 if 'scan_results' not in st.session_state:
     st.session_state.scan_results = None
@@ -512,7 +626,18 @@ if scan_button and not st.session_state.is_scanning:
             
             # 執行掃描（暫時移除log_callback，先讓功能正常運行）
             results = scanner.scan_stocks(stock_list, progress_callback=progress_callback)
-            
+
+            # 存進session_state前先降精度：float64→float32、int64→int32，
+            # 低基數文字欄位轉category，後續的顯示/CSV/JSON都按比例變快
+            if len(results) > 0:
+                downcast_map = {c: 'float32' for c in results.select_dtypes('float64').columns}
+                downcast_map.update({c: 'int32' for c in results.select_dtypes('int64').columns})
+                if downcast_map:
+                    results = results.astype(downcast_map)
+                for c in ('族群', '買入訊號', '波段狀態'):
+                    if c in results.columns:
+                        results[c] = results[c].astype('category')
+
             progress_bar.progress(1.0)
             st.session_state.scan_results = results
             st.session_state.is_scanning = False
@@ -1097,7 +1222,7 @@ if scan_button and not st.session_state.is_scanning:
                     st.metric("強買入", strong_buy)
                 
                 # 導出按鈕
-                csv = results.to_csv(index=False, encoding='utf-8-sig')
+                csv = _make_csv_bytes(results)
                 st.download_button(
                     label="💾 導出完整CSV報告",
                     data=csv,
@@ -1173,45 +1298,44 @@ elif st.session_state.scan_results is not None and not st.session_state.is_scann
             stock_id_col = 'Stock_ID'
         
         if stock_id_col:
-            results['族群'] = results[stock_id_col].map(TaiwanStockScanner.DEFAULT_TICKERS).fillna('其他')
+            # 用import時建好的查表Series做reindex，直接得到category欄位
+            results['族群'] = (
+                TaiwanStockScanner.DEFAULT_TICKERS_SERIES
+                .reindex(results[stock_id_col])
+                .fillna('其他')
+                .values
+            )
         else:
             results['族群'] = '其他'
     
     # 顯示結果表格（使用與主掃描流程一致的列名）
-    # 優先使用主掃描流程的列名，如果不存在則使用舊的列名
-    display_cols = []
-    
-    # 主掃描流程的列名（優先）
-    main_cols = ['族群', '股票代碼', '股票名稱', '當前股價', 'MA5', 'MA20', 'MA50', 'MA60', 'MA200', 
-                 '策略評分', '買入訊號', '波段狀態', '建議持有天數',
-                 '建議停損價(ATR)', '移動停損價', '建議停利價']
-    
-    # 舊版本的列名（後備）
-    old_cols = ['Stock_ID', '族群', 'Total_Score', 'Close', 'Trend_Score', 
-                'Momentum_Score', 'RS_Score', 'Stop_Loss_Price', 'Risk_Percent']
-    
-    # 優先使用主掃描流程的列名
-    for col in main_cols:
-        if col in results.columns:
-            display_cols.append(col)
-    
-    # 如果主掃描流程的列名都沒有，則使用舊的列名
-    if not display_cols:
-        for col in old_cols:
-            if col in results.columns:
-                display_cols.append(col)
-    
-    # 如果還是沒有，顯示所有可用的列
-    if not display_cols:
-        display_cols = list(results.columns)
-    
+    # 以C層的Index.intersection做交集：優先主掃描流程列名，
+    # 其次舊版列名，最後退回顯示所有欄位
+    cols = results.columns
+    display_cols = (
+        list(MAIN_DISPLAY_COLS.intersection(cols, sort=False))
+        or list(OLD_DISPLAY_COLS.intersection(cols, sort=False))
+        or list(cols)
+    )
+
+    # 只把畫面需要的部分送進前端：預設顯示評分前200名，
+    # 少看的均線欄位預設隱藏，可自行勾選
+    page_size = st.session_state.get('page_size', 200)
+    default_cols = [c for c in display_cols if c not in ('MA50', 'MA200')]
+    chosen_cols = st.multiselect('顯示欄位', display_cols, default=default_cols)
+
     st.dataframe(
-        results[display_cols],
+        results.head(page_size)[chosen_cols or display_cols],
         use_container_width=True,
         height=400
     )
+
+    if len(results) > page_size:
+        if st.button(f"顯示全部 {len(results)} 筆"):
+            st.session_state.page_size = len(results)
+            st.rerun()
     
-    csv = results.to_csv(index=False, encoding='utf-8-sig')
+    csv = _make_csv_bytes(results)
     st.download_button(
         label="💾 導出CSV報告",
         data=csv,
@@ -1248,138 +1372,67 @@ if st.session_state.scan_results is not None and not st.session_state.is_scannin
             # 檢查是否為佔位URL
             if IS_PLACEHOLDER_URL:
                 st.info("💡 **Webhook URL 未配置**\n\n目前使用的是佔位URL。要使用此功能，請：\n1. 在代碼中將 `WEBHOOK_URL` 替換為真實的webhook地址\n2. 或在側邊欄配置webhook URL（需開發）\n\n📋 **預覽本次要發送的數據結構：**")
-                
-                # 讀取並準備數據（用於預覽）
-                results_df = st.session_state.scan_results.copy()
-                
-                # 處理無法JSON序列化的類型
-                import numpy as np
-                import pandas as pd
-                
-                df_for_json = results_df.copy()
-                
-                for col in df_for_json.columns:
-                    if pd.api.types.is_datetime64_any_dtype(df_for_json[col]):
-                        df_for_json[col] = df_for_json[col].astype(str)
-                    elif pd.api.types.is_integer_dtype(df_for_json[col]):
-                        df_for_json[col] = df_for_json[col].astype(object).where(pd.notna(df_for_json[col]), None)
-                    elif pd.api.types.is_float_dtype(df_for_json[col]):
-                        df_for_json[col] = df_for_json[col].astype(object).where(pd.notna(df_for_json[col]), None)
-                    else:
-                        df_for_json[col] = df_for_json[col].astype(object).where(pd.notna(df_for_json[col]), None)
-                
-                results_json = df_for_json.to_dict(orient='records')
-                
-                def clean_value(val):
-                    if pd.isna(val) or val is None:
-                        return None
-                    elif isinstance(val, (pd.Timestamp, pd.Timedelta)):
-                        return str(val)
-                    elif isinstance(val, (np.integer, np.floating)):
-                        return float(val) if isinstance(val, np.floating) else int(val)
-                    elif isinstance(val, np.ndarray):
-                        return val.tolist()
-                    else:
-                        return val
-                
-                cleaned_results_json = []
-                for record in results_json:
-                    cleaned_record = {k: clean_value(v) for k, v in record.items()}
-                    cleaned_results_json.append(cleaned_record)
-                
-                payload = {
-                    "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    "data": cleaned_results_json
-                }
-                
-                # 顯示數據預覽
-                st.json(payload)
-                st.info(f"📊 共準備發送 {len(cleaned_results_json)} 筆股票數據")
-                # 不發送請求，只顯示預覽（使用else分支處理真實URL情況）
+
+                # 預覽才materialize整份payload；發送走逐批惰性轉換
+                payload = _build_payload(st.session_state.scan_results)
+
+                # 顯示數據預覽，不發送請求（先編碼，避免numpy型別進st.json）
+                st.json(_encode_payload(payload).decode('utf-8'))
+                st.info(f"📊 共準備發送 {len(payload['data'])} 筆股票數據")
             else:
                 # 真實URL，執行發送流程
-                # 讀取目前畫面已存在、已計算完成的結果
-                results_df = st.session_state.scan_results.copy()
-                
-                # 處理無法JSON序列化的類型（Timestamp、numpy類型等）
-                # 將Timestamp轉換為字符串，將numpy類型轉換為Python原生類型
-                import numpy as np
-                import pandas as pd
-                
-                # 複製DataFrame以避免修改原始數據
-                df_for_json = results_df.copy()
-                
-                # 遍歷所有列，處理Timestamp和numpy類型
-                for col in df_for_json.columns:
-                    # 將Timestamp轉換為字符串
-                    if pd.api.types.is_datetime64_any_dtype(df_for_json[col]):
-                        df_for_json[col] = df_for_json[col].astype(str)
-                    # 將numpy類型轉換為Python原生類型
-                    elif pd.api.types.is_integer_dtype(df_for_json[col]):
-                        df_for_json[col] = df_for_json[col].astype(object).where(pd.notna(df_for_json[col]), None)
-                    elif pd.api.types.is_float_dtype(df_for_json[col]):
-                        df_for_json[col] = df_for_json[col].astype(object).where(pd.notna(df_for_json[col]), None)
-                    # 處理其他可能的numpy類型
-                    else:
-                        df_for_json[col] = df_for_json[col].astype(object).where(pd.notna(df_for_json[col]), None)
-                
-                # 將DataFrame轉換為JSON格式（records格式，每行一個字典）
-                # 使用date_format='iso'確保日期格式正確
-                results_json = df_for_json.to_dict(orient='records')
-                
-                # 再次清理：確保所有值都是JSON可序列化的
-                def clean_value(val):
-                    if pd.isna(val) or val is None:
-                        return None
-                    elif isinstance(val, (pd.Timestamp, pd.Timedelta)):
-                        return str(val)
-                    elif isinstance(val, (np.integer, np.floating)):
-                        return float(val) if isinstance(val, np.floating) else int(val)
-                    elif isinstance(val, np.ndarray):
-                        return val.tolist()
-                    else:
-                        return val
-                
-                # 清理每個字典中的值
-                cleaned_results_json = []
-                for record in results_json:
-                    cleaned_record = {k: clean_value(v) for k, v in record.items()}
-                    cleaned_results_json.append(cleaned_record)
-                
-                results_json = cleaned_results_json
-                
-                # 準備要發送的數據（包含時間戳和數據）
-                payload = {
-                    "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    "data": results_json
-                }
-                
-                # 導入requests（如果尚未導入）
-                try:
-                    import requests
-                except ImportError:
+                if requests is None:
                     st.error("❌ 錯誤：缺少 requests 套件。請執行：pip install requests")
                     st.stop()
-                
-                # 發送POST請求到webhook
+
+                # 分批發送：把整批結果拆成多個小請求，
+                # 避免單一大請求撞上10秒timeout，失敗時只需重送該批
+                # records逐批惰性轉換：同一時間記憶體裡只有一批dict，
+                # 不會整份DataFrame+整份records清單同時存在
+                src = st.session_state.scan_results
+                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                CHUNK_SIZE = 200
+                total_records = len(src)
+                total_batches = max(1, (total_records + CHUNK_SIZE - 1) // CHUNK_SIZE)
+
+                failed_batches = []
+                progress = st.progress(0)
                 with st.spinner("正在發送數據到自動化系統..."):
-                    try:
-                        response = requests.post(
-                            WEBHOOK_URL,
-                            json=payload,
-                            timeout=10,
-                            headers={'Content-Type': 'application/json'}
-                        )
-                        
-                        if response.status_code == 200:
-                            st.success("✅ 成功發送數據到自動化系統！")
-                            st.json(payload)  # 可選：顯示發送的數據預覽
-                        else:
-                            st.warning(f"⚠️ 伺服器回應：{response.status_code} - {response.text}")
-                            
-                    except requests.exceptions.RequestException as e:
-                        st.error(f"❌ 發送失敗：{str(e)}")
-                        st.info("💡 請檢查webhook URL是否正確，以及網絡連接是否正常")
+                    for batch_index in range(total_batches):
+                        chunk = src.iloc[batch_index * CHUNK_SIZE:(batch_index + 1) * CHUNK_SIZE]
+                        batch_payload = {
+                            "timestamp": timestamp,
+                            "batch_index": batch_index,
+                            "total_batches": total_batches,
+                            "data": _df_to_jsonable_records(chunk)
+                        }
+                        body = _encode_payload(batch_payload)
+                        headers = {'Content-Type': 'application/json'}
+                        # 超過50kB才壓縮；數值為主的JSON約有8-10倍壓縮率，
+                        # compresslevel=1已足夠，再高只是多燒CPU
+                        if len(body) > 50_000:
+                            body = gzip.compress(body, compresslevel=1)
+                            headers['Content-Encoding'] = 'gzip'
+                        try:
+                            response = _SESSION.post(
+                                WEBHOOK_URL,
+                                data=body,
+                                timeout=10,
+                                headers=headers
+                            )
+                            if response.status_code != 200:
+                                failed_batches.append(batch_index + 1)
+                                st.warning(f"⚠️ 第 {batch_index + 1} 批伺服器回應：{response.status_code} - {response.text}")
+                        except requests.exceptions.RequestException as e:
+                            failed_batches.append(batch_index + 1)
+                            st.error(f"❌ 第 {batch_index + 1} 批發送失敗：{str(e)}")
+                        progress.progress((batch_index + 1) / total_batches)
+
+                if not failed_batches:
+                    st.success(f"✅ 成功發送 {total_records} 筆數據（共 {total_batches} 批）到自動化系統！")
+                else:
+                    st.warning(f"⚠️ 共 {len(failed_batches)} 批發送失敗：{failed_batches}")
+                    st.info("💡 請檢查webhook URL是否正確，以及網絡連接是否正常")
             
         except Exception as e:
             st.error(f"❌ 處理數據時發生錯誤：{str(e)}")
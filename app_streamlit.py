@@ -5,9 +5,24 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import os
+import io
 from data_fetcher import DataFetcher
 from alpha_strategy import AlphaStrategy
 
+
+def _make_csv_bytes(df: pd.DataFrame) -> bytes:
+    """輸出帶UTF-8 BOM的CSV bytes
+
+    直接寫進BytesIO並預置BOM，省掉to_csv(encoding='utf-8-sig')回傳str
+    後Streamlit再重新編碼一次的來回轉碼。
+    """
+    buf = io.BytesIO()
+    buf.write(b'\xef\xbb\xbf')
+    df.to_csv(buf, index=False, encoding='utf-8', lineterminator='\n')
+    return buf.getvalue()
+
 # 頁面配置
 st.set_page_config(
     page_title="台灣股票選股系統",
@@ -282,19 +297,27 @@ elif run_button:
                     stop_loss_atr_multiplier=float(stop_loss_mult)
                 )
                 
-                # 運行策略
-                all_results = []
-                for stock_id, df in data_dict.items():
+                # 運行策略（多執行緒並行分析：pandas/NumPy數值核心會釋放GIL，
+                # 多支股票可同時使用多個CPU核心）
+                def _analyze(item):
+                    stock_id, df = item
                     analyzed_df = strategy.analyze_stock(df, stock_id)
-                    signals = strategy.get_signals_summary(analyzed_df)
-                    if len(signals) > 0:
-                        all_results.append(signals)
+                    return strategy.get_signals_summary(analyzed_df)
+
+                max_workers = min(8, os.cpu_count() or 1, len(data_dict))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    all_results = [
+                        signals for signals in executor.map(_analyze, data_dict.items())
+                        if len(signals) > 0
+                    ]
                 
                 progress_bar.progress(90)
                 
                 # 顯示結果
                 if all_results:
-                    final_report = pd.concat(all_results, ignore_index=False)
+                    # copy=False/sort=False：各stock的signals已是獨立frame，
+                    # 串接時不需要再複製一份、也不用重排欄位
+                    final_report = pd.concat(all_results, ignore_index=False, copy=False, sort=False)
                     final_report = final_report.sort_index()
                     
                     # 只顯示真實數據欄位
@@ -342,7 +365,7 @@ elif run_button:
                     )
                     
                     # 導出按鈕
-                    csv = final_report.to_csv(index=False, encoding='utf-8-sig')
+                    csv = _make_csv_bytes(final_report)
                     st.download_button(
                         label="💾 導出CSV報告",
                         data=csv,
@@ -370,7 +393,7 @@ elif st.session_state.results is not None:
     st.subheader("📋 上次分析結果")
     st.dataframe(st.session_state.results, use_container_width=True, height=400)
     
-    csv = st.session_state.results.to_csv(index=False, encoding='utf-8-sig')
+    csv = _make_csv_bytes(st.session_state.results)
     st.download_button(
         label="💾 導出CSV報告",
         data=csv,
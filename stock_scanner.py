@@ -2,14 +2,179 @@
 Taiwan Stock Market Scanner - 專業評分系統
 使用多因子評分系統掃描全市場股票
 """
+import json
+import os
 import pandas as pd
 import numpy as np
 import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import List, Dict, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+# bottleneck為可選加速套件：move_max是C實作的滑動最大值，
+# 比pandas rolling的deque實作快數倍
+try:
+    import bottleneck as bn
+except ImportError:
+    bn = None
+
+# numba為可選加速套件：缺少時njit退化為no-op裝飾器，
+# 函數改以純Python執行（在NumPy陣列上迭代仍遠快於逐格.iloc）
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrapper(func):
+            return func
+        return wrapper
+
+
+@njit(cache=True)
+def _rsi_wilder_loop(gain: np.ndarray, loss: np.ndarray, period: int) -> tuple:
+    """Wilder RSI的平滑遞迴：首值取前period日簡單平均，之後EMA(alpha=1/period)
+
+    抽成模組層函數讓numba能編譯這段無法用單一pandas呼叫表達的遞迴。
+
+    Returns:
+    --------
+    tuple: (smoothed_gain, smoothed_loss) 兩條np.ndarray，前period-1位為NaN
+    """
+    n = gain.size
+    smoothed_gain = np.full(n, np.nan)
+    smoothed_loss = np.full(n, np.nan)
+    if n < period:
+        return smoothed_gain, smoothed_loss
+
+    acc_gain = 0.0
+    acc_loss = 0.0
+    for i in range(period):
+        acc_gain += gain[i]
+        acc_loss += loss[i]
+    acc_gain /= period
+    acc_loss /= period
+    smoothed_gain[period - 1] = acc_gain
+    smoothed_loss[period - 1] = acc_loss
+
+    alpha = 1.0 / period
+    for i in range(period, n):
+        acc_gain = gain[i] * alpha + acc_gain * (1.0 - alpha)
+        acc_loss = loss[i] * alpha + acc_loss * (1.0 - alpha)
+        smoothed_gain[i] = acc_gain
+        smoothed_loss[i] = acc_loss
+
+    return smoothed_gain, smoothed_loss
+
+
+# RS比率 → 分數查表：searchsorted一趟分桶取代4層巢狀np.where，
+# 少掉每層np.where各自配置的整條臨時陣列
+_RS_BINS = np.array([0.8, 1.0, 1.2, 1.5])
+_RS_SCORES = np.array([20.0, 40.0, 60.0, 80.0, 100.0])
+
+# 趨勢評分查表：(golden_cross << 1) | price_near_ma20 共4種情境
+# [都不滿足, 僅接近MA20, 僅Golden Cross, 完美進場點]
+_TREND_SCORE_LUT = np.array([50.0, 70.0, 80.0, 100.0])
+
+# 波段狀態的固定類別全集：欄位以category存放，
+# 整欄只剩整數碼＋共用字串表，後續比較也不再逐bar比字串
+_SWING_STATES = ['', '不符合', '初升段', '主升段', '拉回找買點', '趨勢轉弱', '趨勢中']
+
+
+def _rolling_count(mask: np.ndarray, window: int, threshold: int) -> np.ndarray:
+    """布林序列的滑動計數是否達門檻（視窗不足的前段一律False）
+
+    Parameters:
+    -----------
+    mask : np.ndarray
+        布林陣列
+    window : int
+        視窗長度
+    threshold : int
+        視窗內至少需要幾個True
+
+    Returns:
+    --------
+    np.ndarray: 布林陣列
+    """
+    n = mask.size
+    out = np.zeros(n, dtype=bool)
+    if n >= window:
+        prefix = np.concatenate((np.zeros(1), np.cumsum(mask, dtype=np.float64)))
+        out[window - 1:] = (prefix[window:] - prefix[:-window]) >= threshold
+    return out
+
+
+def _rolling_max(series: pd.Series, window: int, min_periods: Optional[int] = None) -> np.ndarray:
+    """滑動最大值：有bottleneck時走C實作，否則退回pandas rolling
+
+    Parameters:
+    -----------
+    series : pd.Series
+        輸入序列
+    window : int
+        視窗長度
+    min_periods : int, optional
+        視窗內最少有效筆數（預設同window，對齊rolling行為）
+
+    Returns:
+    --------
+    np.ndarray: 滑動最大值陣列
+    """
+    if bn is not None:
+        return bn.move_max(
+            series.to_numpy(dtype=np.float64), window=window,
+            min_count=window if min_periods is None else min_periods)
+    return series.rolling(window=window, min_periods=min_periods).max().to_numpy()
+
+
+def _rolling_means(values: np.ndarray, windows: tuple) -> dict:
+    """用單一前綴和一次算出多個窗口的滑動平均
+
+    同一條序列的多個rolling(...).mean()各自完整掃一遍數據；
+    改以prefix sum共用一趟累加後，每個窗口只剩一次向量減法。
+
+    Parameters:
+    -----------
+    values : np.ndarray
+        輸入序列
+    windows : tuple
+        窗口長度集合
+
+    Returns:
+    --------
+    dict: 窗口長度對應滑動平均陣列（前window-1位為NaN，對齊rolling行為）
+    """
+    if bn is not None:
+        # C實作的move_mean雖逐窗口各掃一遍，仍快過Python層的前綴和路徑
+        return {
+            window: bn.move_mean(values, window=window, min_count=window)
+            for window in windows
+        }
+    n = values.size
+    prefix = np.concatenate((np.zeros(1), np.cumsum(values, dtype=np.float64)))
+    out = {}
+    for window in windows:
+        ma = np.full(n, np.nan)
+        if n >= window:
+            ma[window - 1:] = (prefix[window:] - prefix[:-window]) / window
+        out[window] = ma
+    return out
+
+
+@lru_cache(maxsize=128)
+def _get_ticker(symbol: str) -> yf.Ticker:
+    """同一代號共用一個yf.Ticker實例
+
+    重試與.TW→.TWO回退路徑可能對同一代號建構多次Ticker，
+    每次都重新初始化session；memoize後同代號重用同一條連線。
+    """
+    return yf.Ticker(symbol)
+
 
 class TaiwanStockScanner:
     """台灣股市掃描器 - 使用評分系統"""
@@ -57,6 +222,11 @@ class TaiwanStockScanner:
     
     # 為了向後兼容，保留列表格式
     DEFAULT_STOCK_LIST = list(DEFAULT_TICKERS.keys())
+
+    # 族群查表Series（import時建好一次，顯示層reindex即可取得category欄位，
+    # 不必每次rerender重建映射）
+    # 先把'其他'加進categories，讓顯示層reindex後能直接fillna
+    DEFAULT_TICKERS_SERIES = pd.Series(DEFAULT_TICKERS, dtype='category').cat.add_categories(['其他'])
     
     def __init__(self, 
                  trend_weight: float = 0.40,
@@ -106,7 +276,113 @@ class TaiwanStockScanner:
         # 台股使用^TWII（台灣加權指數），美股使用^GSPC（S&P 500）
         self.benchmark_ticker_tw = '^TWII'  # 台灣加權指數
         self.benchmark_ticker_us = '^GSPC'  # 美股標普500
+
+        # 基準250日變化率快取：同一掃描中每支股票的基準半邊完全相同，
+        # 只算一次（掃描開始時清空，key為基準frame的id）
+        self._bench_pct_cache = {}
+
+        # ticker.info當日快取：基本面/籌碼面/名稱回退共用同一份info，
+        # 每支股票每天最多打一次Yahoo（key為(代號, 日期)）
+        self._info_cache = {}
+
+        # 市場環境判讀當日快取：(日期, 結果)，同日重複掃描免重算
+        self._market_env_cache = None
+
+        # 股票名稱磁碟快取：名稱幾乎不變，跨session持久化，
+        # 掃描清單外的代號只需向Yahoo查一次名稱
+        self._name_cache = self._load_name_cache()
+
+        # 後綴映射磁碟快取：記住哪些代號實際是上櫃（.TW→.TWO），
+        # 之後直接用.TWO抓，省掉每次都先打一輪註定失敗的.TW請求
+        self._suffix_map = self._load_suffix_map()
     
+    # 當日磁碟快取：盤中重複掃描時不必重新下載同一段歷史
+    CACHE_DIR = 'cache'
+
+    def _cache_path(self, key: str) -> str:
+        """回傳快取檔路徑（key已含代號與年數）"""
+        return os.path.join(self.CACHE_DIR, f"scan_{key}.parquet")
+
+    def _load_cached(self, key: str) -> Optional[pd.DataFrame]:
+        """嘗試讀取當日磁碟快取
+
+        只有當日寫入的快取才視為有效（隔天可能有新K棒）。
+        快取損壞或環境缺少parquet引擎時回傳None，照常下載。
+        """
+        path = self._cache_path(key)
+        try:
+            if os.path.exists(path):
+                mtime_date = datetime.fromtimestamp(os.path.getmtime(path)).date()
+                if mtime_date >= datetime.now().date():
+                    return pd.read_parquet(path)
+        except Exception:
+            pass
+        return None
+
+    def _save_cache(self, key: str, df: pd.DataFrame):
+        """把剛下載的數據寫入磁碟快取（失敗時靜默略過，不影響主流程）"""
+        try:
+            os.makedirs(self.CACHE_DIR, exist_ok=True)
+            df.to_parquet(self._cache_path(key))
+        except Exception:
+            pass
+
+    def _load_name_cache(self) -> dict:
+        """讀取股票名稱磁碟快取（不存在或損壞時回傳空dict）"""
+        try:
+            path = os.path.join(self.CACHE_DIR, 'stock_names.json')
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception:
+            pass
+        return {}
+
+    def _save_name_cache(self):
+        """把名稱快取寫回磁碟（失敗時靜默略過，不影響主流程）"""
+        try:
+            os.makedirs(self.CACHE_DIR, exist_ok=True)
+            path = os.path.join(self.CACHE_DIR, 'stock_names.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self._name_cache, f, ensure_ascii=False)
+        except Exception:
+            pass
+
+    def _load_suffix_map(self) -> dict:
+        """讀取.TW→.TWO後綴映射快取（不存在或損壞時回傳空dict）"""
+        try:
+            path = os.path.join(self.CACHE_DIR, 'suffix_map.json')
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception:
+            pass
+        return {}
+
+    def _save_suffix_map(self):
+        """把後綴映射寫回磁碟（失敗時靜默略過，不影響主流程）"""
+        try:
+            os.makedirs(self.CACHE_DIR, exist_ok=True)
+            path = os.path.join(self.CACHE_DIR, 'suffix_map.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self._suffix_map, f, ensure_ascii=False)
+        except Exception:
+            pass
+
+    def _get_ticker_info(self, stock_id: str) -> dict:
+        """取得ticker.info（當日快取）
+
+        基本面檢查、籌碼面查詢與名稱回退各自都會抓一次info，
+        每次都是一趟HTTP往返；info內容至多每日更新一次，
+        首次取得後按(代號, 日期)記在實例上直接回用。
+        """
+        key = (stock_id, datetime.now().date())
+        info = self._info_cache.get(key)
+        if info is None:
+            info = _get_ticker(stock_id).info or {}
+            self._info_cache[key] = info
+        return info
+
     def fetch_stock_data(self, stock_id: str, years: int = 2, allow_fallback: bool = True) -> tuple:
         """
         獲取股票數據（增強版：支持回退和詳細錯誤日誌）
@@ -128,6 +404,13 @@ class TaiwanStockScanner:
             - error_msg: 錯誤訊息（如果失敗）
         """
         original_stock_id = stock_id
+        # 當日快取命中時直接回傳，完全跳過網路
+        cached = self._load_cached(f"{stock_id}_{years}y")
+        if cached is not None:
+            print(f"📦 {stock_id}: 使用當日磁碟快取，共 {len(cached)} 筆")
+            return cached, years, None
+        # 先前確認過要用.TWO的代號直接替換，免再走一輪.TW失敗重試
+        stock_id = self._suffix_map.get(stock_id, stock_id)
         # 確保end_date是今天（明確設置，不依賴時區）
         end_date = datetime.now()
         # 為了確保獲取最新數據，end_date設為明天（這樣會包含今天的數據）
@@ -137,7 +420,7 @@ class TaiwanStockScanner:
             """嘗試獲取數據的內部函數（優先使用ticker.history，更穩定）"""
             hist_data = None
             try:
-                ticker = yf.Ticker(ticker_symbol)
+                ticker = _get_ticker(ticker_symbol)
                 
                 # 優先使用start/end方式（確保獲取到最新日期）
                 try:
@@ -213,38 +496,43 @@ class TaiwanStockScanner:
             
             return hist_data, None
         
+        def try_fetch_with_fallback(ticker_symbol):
+            """先抓指定年數，失敗且允許回退時改抓1年
+
+            主代號與.TWO回退共用同一套「指定年數→1年」重試流程，
+            回傳 (hist_data, error, actual_years)。
+            """
+            hist, err = try_fetch(
+                ticker_symbol, f"{years}y" if years <= 1 else None,
+                start_date, end_date_plus_one)
+            got_years = years
+            if (hist is None or hist.empty) and allow_fallback and years > 1:
+                print(f"⚠️ {ticker_symbol}: 無法獲取{years}年數據，回退到1年數據...")
+                start_date_1y = end_date - timedelta(days=365)
+                hist, err = try_fetch(ticker_symbol, "1y", start_date_1y, end_date_plus_one)
+                got_years = 1
+            return hist, err, got_years
+
         # 嘗試獲取指定年數的數據
         try:
             start_date = end_date - timedelta(days=years * 365)
-            
+
             # 嘗試獲取數據（使用end_date_plus_one確保包含今天）
-            hist_data, error = try_fetch(stock_id, f"{years}y" if years <= 1 else None, start_date, end_date_plus_one)
-            
-            # 如果失敗且允許回退，嘗試1年數據
-            if (hist_data is None or hist_data.empty) and allow_fallback and years > 1:
-                print(f"⚠️ {stock_id}: 無法獲取{years}年數據，回退到1年數據...")
-                start_date_1y = end_date - timedelta(days=365)
-                hist_data, error = try_fetch(stock_id, "1y", start_date_1y, end_date_plus_one)
-                actual_years = 1
-            else:
-                actual_years = years
-            
+            hist_data, error, actual_years = try_fetch_with_fallback(stock_id)
+
             # 如果還是失敗，嘗試.TWO（針對上櫃股票）
             if (hist_data is None or hist_data.empty) and stock_id.endswith('.TW') and len(stock_id) == 8:
                 alt_ticker_id = stock_id.replace('.TW', '.TWO')
                 print(f"ℹ️ {stock_id}: 嘗試.TWO後綴: {alt_ticker_id}")
                 try:
-                    hist_data, error = try_fetch(alt_ticker_id, f"{years}y" if years <= 1 else None, start_date, end_date_plus_one)
-                    
-                    # 如果.TWO也失敗且允許回退，嘗試1年
-                    if (hist_data is None or hist_data.empty) and allow_fallback and years > 1:
-                        start_date_1y = end_date - timedelta(days=365)
-                        hist_data, error = try_fetch(alt_ticker_id, "1y", start_date_1y, end_date_plus_one)
-                        actual_years = 1
-                    
+                    hist_data, error, actual_years = try_fetch_with_fallback(alt_ticker_id)
+
                     if hist_data is not None and not hist_data.empty:
                         print(f"✅ {stock_id}: 成功從.TWO獲取數據")
                         stock_id = alt_ticker_id
+                        # 記下這個代號是上櫃，下次（含跨session）直接抓.TWO
+                        self._suffix_map[original_stock_id] = alt_ticker_id
+                        self._save_suffix_map()
                 except Exception as e:
                     error = f"Failed to try .TWO: {str(e)}"
             
@@ -274,10 +562,19 @@ class TaiwanStockScanner:
             df = df.sort_values('Date').reset_index(drop=True)
             df.set_index('Date', inplace=True)
             
-            # 填充缺失值
-            df = df.ffill().bfill()
-            
+            # 填充缺失值（yfinance回應通常無缺漏：先一次檢查，
+            # 常態路徑省掉兩趟整表填值）
+            if df.isna().values.any():
+                df = df.ffill().bfill()
+
+            # OHLCV常駐記憶體降為float32（頻寬與快取檔大小減半）；
+            # 指標計算取陣列時會再轉回float64，精度足夠價量數據的4-6位有效數字
+            df = df.astype(np.float32)
+
             print(f"✅ {stock_id}: 成功獲取 {len(df)} 筆數據（約{actual_years}年）")
+            # 只有拿到完整要求年數時才寫快取，避免回退的1年數據冒充2年
+            if actual_years == years:
+                self._save_cache(f"{original_stock_id}_{years}y", df)
             return df, actual_years, None
             
         except Exception as e:
@@ -311,120 +608,195 @@ class TaiwanStockScanner:
                 # 默認使用台股基準
                 benchmark = self.benchmark_ticker_tw
             
-            ticker = yf.Ticker(benchmark)
+            # 基準指數同樣走當日磁碟快取
+            cached = self._load_cached(f"{benchmark}_{years}y")
+            if cached is not None:
+                return cached
+
+            ticker = _get_ticker(benchmark)
             end_date = datetime.now()
             start_date = end_date - timedelta(days=years * 365)
-            
+
             hist_data = ticker.history(start=start_date.strftime('%Y-%m-%d'),
                                       end=end_date.strftime('%Y-%m-%d'))
-            
+
             if hist_data.empty:
                 return None
-            
+
             df = hist_data[['Close']].copy()
             df.columns = ['Benchmark_Close']
+            self._save_cache(f"{benchmark}_{years}y", df)
             return df
             
         except Exception as e:
             print(f"獲取基準數據失敗: {str(e)}")
             return None
     
+    def _fetch_batch(self, symbols: List[str], years: int = 2) -> Dict[str, pd.DataFrame]:
+        """
+        用單一yf.download請求批次抓取多個代號
+
+        Yahoo的批次端點允許一次帶多個代號，整個掃描清單（含基準指數）
+        可以收斂成一次HTTP往返；抓不到的代號留給逐檔路徑回補。
+
+        Parameters:
+        -----------
+        symbols : List[str]
+            要抓取的代號列表（可含^TWII等基準指數）
+        years : int
+            獲取多少年的數據
+
+        Returns:
+        --------
+        Dict[str, pd.DataFrame]: 成功抓到數據的代號對應OHLCV DataFrame
+        """
+        out = {}
+        if not symbols:
+            return out
+
+        try:
+            data = yf.download(
+                tickers=' '.join(symbols),
+                period=f'{years}y',
+                group_by='ticker',
+                threads=True,
+                progress=False,
+                auto_adjust=True,
+            )
+        except Exception as e:
+            print(f"⚠️ 批次下載失敗，改用逐檔抓取: {str(e)}")
+            return out
+
+        if data is None or data.empty:
+            return out
+
+        required_cols = ['Open', 'High', 'Low', 'Close', 'Volume']
+        for symbol in symbols:
+            try:
+                # 多代號時欄位是(代號, 欄位)的MultiIndex；單一代號時是平面欄位
+                sub = data[symbol] if isinstance(data.columns, pd.MultiIndex) else data
+                sub = sub[required_cols].dropna(how='all')
+            except (KeyError, IndexError):
+                continue
+
+            if sub.empty:
+                continue
+
+            df = sub.copy()
+            if df.isna().values.any():
+                df = df.ffill().bfill()
+            # 與fetch_stock_data一致：常駐OHLCV以float32存放
+            df = df.astype(np.float32)
+            df.index.name = 'Date'
+            out[symbol] = df
+
+        return out
+
     def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """計算技術指標"""
-        df = df.copy()
-        
-        # 移動平均線（價格）
-        df['MA5'] = df['Close'].rolling(window=5).mean()  # 5日均線
-        df['MA20'] = df['Close'].rolling(window=self.ma_short).mean()  # 短期均線
-        df['MA50'] = df['Close'].rolling(window=50).mean()  # 中期均線（長期趨勢確認）
-        df['MA60'] = df['Close'].rolling(window=self.ma_long).mean()  # 長期均線
-        
+        """計算技術指標
+
+        注意：指標欄位直接加在傳入的DataFrame上（不複製）。
+        呼叫端傳入的都是fetch_stock_data剛產生的獨立frame，
+        只新增欄位、不改動原有OHLCV數據。
+        """
+        # 移動平均線（價格）：所有窗口共用一條前綴和，整段只掃一遍Close
+        close_arr = df['Close'].to_numpy(dtype=np.float64)
+        price_windows = (5, self.ma_short, 50, self.ma_long)
+        if len(df) >= 200:
+            price_windows = price_windows + (200,)
+        price_mas = _rolling_means(close_arr, price_windows)
+        df['MA5'] = price_mas[5]  # 5日均線
+        df['MA20'] = price_mas[self.ma_short]  # 短期均線
+        df['MA50'] = price_mas[50]  # 中期均線（長期趨勢確認）
+        df['MA60'] = price_mas[self.ma_long]  # 長期均線
+
         # MA200：如果數據不足200個交易日，標記為NaN（而不是Data Error）
         if len(df) >= 200:
-            df['MA200'] = df['Close'].rolling(window=200).mean()  # 超長期均線（長期趨勢保護）
+            df['MA200'] = price_mas[200]  # 超長期均線（長期趨勢保護）
         else:
             df['MA200'] = np.nan  # 數據不足，標記為N/A
             print(f"ℹ️ 數據不足200個交易日，MA200標記為N/A（僅有{len(df)}筆數據）")
-        
-        # 成交量均線
-        df['MA5_Vol'] = df['Volume'].rolling(window=5).mean()
-        df['MA20_Vol'] = df['Volume'].rolling(window=20).mean()  # 20日均量（新增）
+
+        # 成交量均線（同樣共用前綴和）
+        vol_mas = _rolling_means(df['Volume'].to_numpy(dtype=np.float64), (5, 20))
+        df['MA5_Vol'] = vol_mas[5]
+        df['MA20_Vol'] = vol_mas[20]  # 20日均量（新增）
         
         # 計算RSI14（使用Wilder平滑方法 - 標準公式）
         def calculate_rsi_wilder(series, period=14):
             """
             計算RSI指標 - 使用Wilder的平滑方法（標準公式）
-            Wilder使用指數移動平均（EMA）而非簡單移動平均
+            Wilder使用指數移動平均（EMA）而非簡單移動平均；
+            平滑遞迴交給可JIT的模組層迴圈_rsi_wilder_loop，不再逐bar .iloc
             """
             delta = series.diff()
-            
-            # 分離上漲和下跌
-            gain = delta.where(delta > 0, 0.0)
-            loss = -delta.where(delta < 0, 0.0)
-            
-            # 計算初始平均（前period天的簡單平均）
-            avg_gain = gain.rolling(window=period, min_periods=period).mean()
-            avg_loss = loss.rolling(window=period, min_periods=period).mean()
-            
-            # Wilder平滑方法：使用EMA（指數移動平均）
-            # EMA公式：EMA_today = (Value_today × α) + (EMA_yesterday × (1-α))
-            # 對於Wilder RSI，α = 1/period
-            alpha = 1.0 / period
-            
-            # 計算平滑的平均收益和平均損失
-            smoothed_gain = pd.Series(index=series.index, dtype=float)
-            smoothed_loss = pd.Series(index=series.index, dtype=float)
-            
-            for i in range(len(series)):
-                if i < period - 1:
-                    smoothed_gain.iloc[i] = np.nan
-                    smoothed_loss.iloc[i] = np.nan
-                elif i == period - 1:
-                    # 第一個值使用簡單平均
-                    smoothed_gain.iloc[i] = avg_gain.iloc[i]
-                    smoothed_loss.iloc[i] = avg_loss.iloc[i]
-                else:
-                    # 後續值使用Wilder平滑（EMA）
-                    smoothed_gain.iloc[i] = (gain.iloc[i] * alpha) + (smoothed_gain.iloc[i-1] * (1 - alpha))
-                    smoothed_loss.iloc[i] = (loss.iloc[i] * alpha) + (smoothed_loss.iloc[i-1] * (1 - alpha))
-            
-            # 計算RS（相對強度）
-            rs = smoothed_gain / smoothed_loss.replace(0, np.nan)
-            
+
+            # 分離上漲和下跌（首日diff為NaN，where後歸0）
+            gain = delta.where(delta > 0, 0.0).to_numpy(dtype=np.float64)
+            loss = (-delta.where(delta < 0, 0.0)).to_numpy(dtype=np.float64)
+
+            smoothed_gain, smoothed_loss = _rsi_wilder_loop(gain, loss, period)
+
+            # 計算RS（相對強度），避免除零
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rs = smoothed_gain / np.where(smoothed_loss == 0.0, np.nan, smoothed_loss)
+
             # 計算RSI
             rsi = 100 - (100 / (1 + rs))
-            
-            return rsi
+
+            return pd.Series(rsi, index=series.index)
         df['RSI14'] = calculate_rsi_wilder(df['Close'], period=14)
         
         # 計算60日高點（新增）
-        df['High_60d'] = df['High'].rolling(window=60).max()
-        
-        # 計算自60日高點的回檔幅度（新增）
+        high_60d = _rolling_max(df['High'], 60)
+        df['High_60d'] = high_60d
+
+        # 計算自60日高點的回檔幅度（新增）：中間式直接在陣列上運算，
+        # 不再為每一步配置帶索引的Series（NaN > 0本來就是False，毋須notna）
         df['Pullback_From_60d_High'] = np.where(
-            df['High_60d'].notna() & (df['High_60d'] > 0),
-            ((df['High_60d'] - df['Close']) / df['High_60d']) * 100,
+            high_60d > 0,
+            ((high_60d - close_arr) / high_60d) * 100,
             np.nan
         )
         
-        # ATR
-        df['High_Low'] = df['High'] - df['Low']
-        df['High_Close'] = abs(df['High'] - df['Close'].shift(1))
-        df['Low_Close'] = abs(df['Low'] - df['Close'].shift(1))
-        df['True_Range'] = df[['High_Low', 'High_Close', 'Low_Close']].max(axis=1)
-        df['ATR'] = df['True_Range'].rolling(window=self.atr_period).mean()
-        df.drop(['High_Low', 'High_Close', 'Low_Close', 'True_Range'], axis=1, inplace=True)
+        # ATR：True Range直接在陣列上計算，不再建立三個臨時欄位再drop
+        # np.fmax會忽略NaN，與原先DataFrame.max(axis=1)跳過NaN的行為一致
+        # （首日無前收盤，TR退化為High-Low）
+        high_arr = df['High'].to_numpy(dtype=np.float64)
+        low_arr = df['Low'].to_numpy(dtype=np.float64)
+        prev_close = np.empty_like(close_arr)
+        prev_close[0] = np.nan
+        prev_close[1:] = close_arr[:-1]
+        true_range = np.fmax(
+            np.fmax(high_arr - low_arr, np.abs(high_arr - prev_close)),
+            np.abs(low_arr - prev_close)
+        )
+        df['ATR'] = _rolling_means(true_range, (self.atr_period,))[self.atr_period]
         
         return df
     
     def check_market_environment(self) -> str:
         """
         判斷市場環境：多頭/空頭/盤整
-        
+
+        市場環境以日K判讀，一天內不會改變：同日重複呼叫
+        （每輪掃描的第一支股票都會檢查一次）直接回用快取結果。
+
         Returns:
         --------
         str: '多頭', '空頭', '盤整', '未知'
         """
+        today = datetime.now().date()
+        if self._market_env_cache is not None and self._market_env_cache[0] == today:
+            return self._market_env_cache[1]
+        result = self._check_market_environment_uncached()
+        # '未知'多半是暫時性的網路/數據問題，不入快取，下次呼叫重試
+        if result != '未知':
+            self._market_env_cache = (today, result)
+        return result
+
+    def _check_market_environment_uncached(self) -> str:
+        """實際判讀市場環境（不含快取層）"""
         try:
             benchmark_df = self.fetch_benchmark_data(years=1)
             if benchmark_df is None or len(benchmark_df) < 60:
@@ -450,8 +822,10 @@ class TaiwanStockScanner:
             ma20_above_ma60 = ma20 > ma60 if (pd.notna(ma20) and pd.notna(ma60)) else False
             
             # 計算最近20天的波動性（用於判斷盤整）
-            volatility = recent_20d['Benchmark_Close'].std() / recent_20d['Benchmark_Close'].mean()
-            price_change_20d = (current_price - recent_20d['Benchmark_Close'].iloc[0]) / recent_20d['Benchmark_Close'].iloc[0]
+            recent_close = recent_20d['Benchmark_Close']
+            start_price_20d = recent_close.iloc[0]
+            volatility = recent_close.std() / recent_close.mean()
+            price_change_20d = (current_price - start_price_20d) / start_price_20d
             
             # 判斷邏輯
             if price_above_ma20 and price_above_ma60 and ma20_above_ma60:
@@ -515,9 +889,8 @@ class TaiwanStockScanner:
         is_us_stock = not ('.TW' in stock_id or '.TWO' in stock_id)
         
         try:
-            ticker = yf.Ticker(stock_id)
-            info = ticker.info
-            
+            info = self._get_ticker_info(stock_id)
+
             # 嘗試獲取關鍵財務指標
             financial_data = {}
             issues = []
@@ -591,9 +964,8 @@ class TaiwanStockScanner:
         dict: 包含籌碼面數據的字典
         """
         try:
-            ticker = yf.Ticker(stock_id)
-            info = ticker.info
-            
+            info = self._get_ticker_info(stock_id)
+
             # yfinance對台灣股票的籌碼面數據支持有限
             # 這裡嘗試獲取可能存在的相關字段
             institutional_data = {}
@@ -610,7 +982,17 @@ class TaiwanStockScanner:
         except Exception as e:
             return {}
     
-    def calculate_relative_strength(self, stock_df: pd.DataFrame, 
+    def _benchmark_pct250(self, benchmark_df: pd.DataFrame) -> pd.Series:
+        """基準指數的250日變化率（同一基準frame只算一次，逐股共用）"""
+        key = id(benchmark_df)
+        cached = self._bench_pct_cache.get(key)
+        if cached is None:
+            bench_close = benchmark_df['Benchmark_Close']
+            cached = ((bench_close / bench_close.shift(250)) - 1) * 100
+            self._bench_pct_cache[key] = cached
+        return cached
+
+    def calculate_relative_strength(self, stock_df: pd.DataFrame,
                                    benchmark_df: Optional[pd.DataFrame]) -> pd.Series:
         """
         計算相對強度（相對於TAIEX）- 標準公式
@@ -627,17 +1009,13 @@ class TaiwanStockScanner:
             # 如果無法獲取基準，返回中性分數
             return pd.Series(50.0, index=stock_df.index)
         
-        # 合併數據
-        merged = pd.merge(
-            stock_df[['Close']],
-            benchmark_df,
-            left_index=True,
-            right_index=True,
-            how='inner'
-        )
-        
+        # 對齊數據：align(join='inner')直接回傳兩條共用索引的Series，
+        # 不必為了取交集再配置一個合併後的DataFrame
+        stock_close, bench_close = stock_df['Close'].align(
+            benchmark_df['Benchmark_Close'], join='inner')
+
         # 需要至少250個交易日，但如果數據不足，使用可用的最大長度
-        min_days = min(250, len(merged))
+        min_days = min(250, len(stock_close))
         if min_days < 60:  # 至少需要60天才能計算
             return pd.Series(50.0, index=stock_df.index)
         
@@ -646,35 +1024,39 @@ class TaiwanStockScanner:
         # Benchmark_%_Change = (Current_Benchmark / Benchmark_250_days_ago - 1) * 100
         # RS = Stock_%_Change / Benchmark_%_Change
         
-        lookback_days = min(250, len(merged))  # 使用可用的最大天數（最多250天）
-        
-        # 計算每個時間點的250天變化率（使用rolling窗口）
-        # 對於每個時間點，使用其250天前的價格作為起始點
-        stock_pct_change = pd.Series(0.0, index=merged.index)
-        benchmark_pct_change = pd.Series(0.0, index=merged.index)
-        
-        # 使用rolling窗口計算每個時間點相對於250天前的變化率
-        for i in range(lookback_days, len(merged)):
-            stock_start_price = merged['Close'].iloc[i - lookback_days]
-            benchmark_start_price = merged['Benchmark_Close'].iloc[i - lookback_days]
-            current_stock_price = merged['Close'].iloc[i]
-            current_benchmark_price = merged['Benchmark_Close'].iloc[i]
-            
+        lookback_days = min(250, len(stock_close))  # 使用可用的最大天數（最多250天）
+
+        if lookback_days == 250:
+            # 計算每個時間點的250天變化率：shift(lookback)一次取出所有起始價，
+            # 整段變化率收斂成單一向量運算，不再逐bar .iloc取純量
+            # 基準半邊對同一基準的每支股票都相同，從掃描層快取reindex取用
+            stock_start = stock_close.shift(250)
+            start_ok = stock_start > 0
+            stock_pct_change = (((stock_close / stock_start) - 1) * 100).where(start_ok, 0.0)
+            benchmark_pct_change = (
+                self._benchmark_pct250(benchmark_df)
+                .reindex(stock_close.index)
+                .fillna(0.0)
+                .where(start_ok, 0.0)
+            )
+        else:
+            # 不足250天的數據：改以首日價格為基準（同樣整段廣播）
+            # 直接在陣列切片上運算，不走.iloc切片賦值的pandas索引機制
+            n = len(stock_close)
+            stock_vals = stock_close.to_numpy()
+            bench_vals = bench_close.to_numpy()
+            stock_pct_arr = np.zeros(n)
+            bench_pct_arr = np.zeros(n)
+            stock_start_price = stock_vals[0]
+            benchmark_start_price = bench_vals[0]
             if stock_start_price > 0 and benchmark_start_price > 0:
-                stock_pct_change.iloc[i] = ((current_stock_price / stock_start_price) - 1) * 100
-                benchmark_pct_change.iloc[i] = ((current_benchmark_price / benchmark_start_price) - 1) * 100
-        
-        # 對於前250天的數據，使用可用的最大窗口
-        if len(merged) < 250:
-            for i in range(min(60, len(merged)), len(merged)):
-                stock_start_price = merged['Close'].iloc[0]
-                benchmark_start_price = merged['Benchmark_Close'].iloc[0]
-                current_stock_price = merged['Close'].iloc[i]
-                current_benchmark_price = merged['Benchmark_Close'].iloc[i]
-                
-                if stock_start_price > 0 and benchmark_start_price > 0:
-                    stock_pct_change.iloc[i] = ((current_stock_price / stock_start_price) - 1) * 100
-                    benchmark_pct_change.iloc[i] = ((current_benchmark_price / benchmark_start_price) - 1) * 100
+                start = min(60, n)
+                stock_pct_arr[start:] = (
+                    (stock_vals[start:] / stock_start_price) - 1) * 100
+                bench_pct_arr[start:] = (
+                    (bench_vals[start:] / benchmark_start_price) - 1) * 100
+            stock_pct_change = pd.Series(stock_pct_arr, index=stock_close.index)
+            benchmark_pct_change = pd.Series(bench_pct_arr, index=stock_close.index)
         
         # 計算相對強度比率（避免除零）
         rs_ratio = stock_pct_change / benchmark_pct_change.replace(0, np.nan)
@@ -682,14 +1064,9 @@ class TaiwanStockScanner:
         
         # 轉換為分數（0-100）
         # RS_ratio > 1.5: 100分, > 1.2: 80分, > 1.0: 60分, > 0.8: 40分, < 0.8: 20分
-        rs_scores = np.where(
-            rs_ratio > 1.5, 100.0,
-            np.where(rs_ratio > 1.2, 80.0,
-            np.where(rs_ratio > 1.0, 60.0,
-            np.where(rs_ratio > 0.8, 40.0, 20.0)))
-        )
-        rs_scores = pd.Series(rs_scores, index=merged.index)
-        rs_scores = rs_scores.fillna(50.0)
+        # （searchsorted以左側插入點分桶，與上列嚴格大於的門檻一致）
+        rs_scores = _RS_SCORES[np.searchsorted(_RS_BINS, rs_ratio.to_numpy())]
+        rs_scores = pd.Series(rs_scores, index=stock_close.index)
         
         # 對齊索引
         result = pd.Series(50.0, index=stock_df.index)
@@ -706,9 +1083,8 @@ class TaiwanStockScanner:
         --------
         pd.DataFrame
             包含所有評分和總分的DataFrame
+            （評分欄位直接加在傳入的frame上，同calculate_indicators的就地約定）
         """
-        df = df.copy()
-        
         # 計算指標
         df = self.calculate_indicators(df)
         
@@ -717,298 +1093,353 @@ class TaiwanStockScanner:
         has_nan = df[critical_cols].isnull().any(axis=1)
         df['Data_Error'] = has_nan
         
+        # SoA：先一次取出NumPy陣列，後續所有布林條件與評分都在陣列上計算，
+        # 不再讓每條式子各自經過pandas的逐欄調度與索引對齊
+        close = df['Close'].to_numpy(dtype=np.float64)
+        volume = df['Volume'].to_numpy(dtype=np.float64)
+        ma5 = df['MA5'].to_numpy(dtype=np.float64)
+        ma20 = df['MA20'].to_numpy(dtype=np.float64)
+        ma50 = df['MA50'].to_numpy(dtype=np.float64)
+        ma60 = df['MA60'].to_numpy(dtype=np.float64)
+        ma200 = df['MA200'].to_numpy(dtype=np.float64)
+        ma5_vol = df['MA5_Vol'].to_numpy(dtype=np.float64)
+        ma20_vol = df['MA20_Vol'].to_numpy(dtype=np.float64)
+        rsi14 = df['RSI14'].to_numpy(dtype=np.float64)
+        atr = df['ATR'].to_numpy(dtype=np.float64)
+        pullback_from_high = df['Pullback_From_60d_High'].to_numpy(dtype=np.float64)
+
         # ===== 長期趨勢保護（MA50/MA200）- 專業級確認 =====
         # 檢查長期趨勢：價格 > MA50 > MA200（確認長期上升趨勢）
-        long_term_trend = (
-            (df['Close'] > df['MA50']) & 
-            (df['MA50'] > df['MA200']) &
-            df['Close'].notna() & 
-            df['MA50'].notna() & 
-            df['MA200'].notna()
-        )
+        # 注意：與NaN的比較本來就是False，不必再疊~np.isnan遮罩
+        long_term_trend = (close > ma50) & (ma50 > ma200)
         df['長期趨勢確認'] = long_term_trend  # 額外的長期趨勢保護
-        
+
         # ===== 新增規則：觀察條件和進場觸發條件 =====
         # 觀察條件：自60日高點回檔 ≥ 20%（不是進場條件，只是觀察）
-        pullback_20pct = df['Pullback_From_60d_High'] >= 20.0
-        pullback_20pct = pullback_20pct & df['Pullback_From_60d_High'].notna()
+        pullback_20pct = pullback_from_high >= 20.0
         df['觀察條件_回檔20%'] = pullback_20pct
-        
+
         # 進場必要條件（Trigger）- 三個必須同時成立：
         # 1. MA20 ≥ MA60（允許等於，與原有規則MA20 > MA60稍有不同，但為了新規則兼容）
-        condition_ma20_ma60 = (df['MA20'] >= df['MA60']) & df['MA20'].notna() & df['MA60'].notna()
-        
+        condition_ma20_ma60 = ma20 >= ma60
+
         # 2. RSI14 重新站上 50
         # 要求：當前RSI >= 50，且之前RSI < 50（重新站上）
         # 或者：當前RSI >= 50 且之前RSI >= 50（持續站上，也符合條件）
-        rsi_current_above_50 = (df['RSI14'] >= 50) & df['RSI14'].notna()
-        rsi_prev_below_50 = (df['RSI14'].shift(1) < 50) | df['RSI14'].shift(1).isna()
+        rsi_prev = np.empty_like(rsi14)
+        rsi_prev[0] = np.nan
+        rsi_prev[1:] = rsi14[:-1]
+        rsi_current_above_50 = rsi14 >= 50
+        # 前日NaN視為「之前未站上」，這裡的isnan是語意需要而非NaN防護
+        rsi_prev_below_50 = (rsi_prev < 50) | np.isnan(rsi_prev)
         rsi_cross_above = rsi_current_above_50 & rsi_prev_below_50  # 重新站上
-        rsi_continuing_above = rsi_current_above_50 & (df['RSI14'].shift(1) >= 50) & df['RSI14'].shift(1).notna()  # 持續站上
+        rsi_continuing_above = rsi_current_above_50 & (rsi_prev >= 50)  # 持續站上
         # 只要當前RSI >= 50，就視為符合條件（包括重新站上和持續站上）
         rsi_stand_above_50 = rsi_current_above_50
-        
+
         # 3. 成交量 ≥ 20日均量
-        volume_above_ma20 = (df['Volume'] >= df['MA20_Vol']) & df['Volume'].notna() & df['MA20_Vol'].notna()
-        
+        volume_above_ma20 = volume >= ma20_vol
+
         # 進場觸發條件：三個條件同時成立
         new_entry_trigger = condition_ma20_ma60 & rsi_stand_above_50 & volume_above_ma20
         df['新規則_進場觸發'] = new_entry_trigger
-        
+
         # 1. 趨勢基礎（波段基石）- 必須滿足：Close > MA20 AND MA20 > MA60（原有規則）
-        trend_foundation = (
-            (df['Close'] > df['MA20']) & 
-            (df['MA20'] > df['MA60']) &
-            df['Close'].notna() & 
-            df['MA20'].notna() & 
-            df['MA60'].notna()
-        )
-        
+        trend_foundation = (close > ma20) & (ma20 > ma60)
+
         # 長期趨勢確認（額外加分項）：如果滿足 MA50/MA200 長期趨勢，額外加分
         # 注意：這是額外的確認，不作為必要條件（因為台股波段交易可能不需要嚴格滿足MA200）
         # 但如果滿足，代表長期趨勢更強，可以獲得更高評分
-        
+
         # 合併原有規則和新規則：必須同時滿足原有趨勢基礎 AND 新進場觸發條件
         # 但為了兼容，我們將新規則作為額外的確認條件
         enhanced_entry_condition = trend_foundation & new_entry_trigger
-        
+
         # 2. 進場點優化（Entry Trigger）
         # 2a. MA5 > MA20 (Golden Cross) - 加分
-        golden_cross = (df['MA5'] > df['MA20']) & df['MA5'].notna() & df['MA20'].notna()
-        
+        golden_cross = ma5 > ma20
+
         # 2b. 當前價格在MA20的3%以內 - 加分（接近支撐線）
-        price_near_ma20 = np.abs((df['Close'] - df['MA20']) / df['MA20']) <= 0.03
-        price_near_ma20 = price_near_ma20 & df['Close'].notna() & df['MA20'].notna()
-        
+        # close/ma20比值只算一次，波段狀態各分支的±5%/±10%門檻共用，
+        # 不必每個分支各自再做一條全長的乘法比較
+        with np.errstate(divide='ignore', invalid='ignore'):
+            close_ma20_ratio = close / ma20
+        price_near_ma20 = np.abs(close_ma20_ratio - 1.0) <= 0.03
+
         # 趨勢評分（40%）：必須有趨勢基礎才能得分
         # 如果同時滿足長期趨勢（MA50/MA200），額外加分
+        # 兩個進場條件共4種組合，位元編碼後查表一次解碼，
+        # 取代3層巢狀np.where各自的臨時陣列配置
+        entry_code = (golden_cross.astype(np.uint8) << 1) | price_near_ma20.astype(np.uint8)
         base_trend_score = np.where(
             trend_foundation,
-            np.where(
-                golden_cross & price_near_ma20, 100.0,  # 完美進場點
-                np.where(golden_cross, 80.0,  # 有Golden Cross
-                np.where(price_near_ma20, 70.0, 50.0))  # 接近MA20
-            ),
+            _TREND_SCORE_LUT[entry_code],
             0.0  # 沒有趨勢基礎，不得分
         )
-        
+
         # 長期趨勢確認加分：如果滿足 MA50 > MA200，額外加5分（最高100分）
         long_term_bonus = np.where(long_term_trend & trend_foundation, 5.0, 0.0)
         trend_score = np.minimum(base_trend_score + long_term_bonus, 100.0)
-        
-        df['Trend_Score'] = trend_score * self.trend_weight
+
+        trend_score_weighted = trend_score * self.trend_weight
+        df['Trend_Score'] = trend_score_weighted
         df['長期趨勢加分'] = long_term_bonus  # 記錄長期趨勢加分
-        
+
         # 3. 動量評分（30%）
         momentum_score = np.where(
-            (df['Volume'] > (self.vol_multiplier * df['MA5_Vol'])) & df['Volume'].notna(),
+            volume > (self.vol_multiplier * ma5_vol),
             100.0,
             0.0
         )
-        df['Momentum_Score'] = momentum_score * self.momentum_weight
-        
+        momentum_score_weighted = momentum_score * self.momentum_weight
+        df['Momentum_Score'] = momentum_score_weighted
+
         # 4. 相對強度評分（20%）
-        rs_scores = self.calculate_relative_strength(df, benchmark_df)
-        df['RS_Score'] = rs_scores * self.relative_strength_weight
-        
+        rs_score_weighted = (
+            self.calculate_relative_strength(df, benchmark_df).to_numpy()
+            * self.relative_strength_weight
+        )
+        df['RS_Score'] = rs_score_weighted
+
         # 5. 機構資金評分（10%）
         # 注意：yfinance對台灣股票的籌碼面數據（外資/投信/自營商買賣超）支持有限
-        # 這裡嘗試從ticker.info獲取機構持股比例（如果可用）
         # 未來可以接入其他數據源（如TWSE API）獲取真實的買賣超數據
-        institutional_score = pd.Series(50.0, index=df.index)  # 默認中性分數
-        
-        # 注意：這裡無法為每行數據獲取不同的籌碼面數據（因為需要為每支股票單獨調用API）
-        # 實際的籌碼面數據應該在scan_stocks時獲取並傳入
-        # 當前實現暫時使用固定分數
-        df['Institutional_Score'] = institutional_score * self.institutional_weight
-        
+        # 這裡無法為每行數據獲取不同的籌碼面數據（因為需要為每支股票單獨調用API）
+        # 實際的籌碼面數據應該在scan_stocks時獲取並傳入，當前實現暫時使用固定中性分數
+        institutional_score_weighted = 50.0 * self.institutional_weight
+        df['Institutional_Score'] = institutional_score_weighted
+
         # 計算總分（只有通過趨勢基礎檢查的才能得分）
         df['Total_Score'] = np.where(
             trend_foundation,
-            df['Trend_Score'] + df['Momentum_Score'] + df['RS_Score'] + df['Institutional_Score'],
+            trend_score_weighted + momentum_score_weighted
+            + rs_score_weighted + institutional_score_weighted,
             0.0  # 沒有趨勢基礎，總分為0
         )
-        
-        # 計算停損價（ATR基礎，2.0倍）
-        df['Stop_Loss_Price'] = np.nan
-        valid_mask = df['ATR'].notna() & df['Close'].notna() & (df['ATR'] > 0)
-        df.loc[valid_mask, 'Stop_Loss_Price'] = (
-            df.loc[valid_mask, 'Close'] - 
-            (df.loc[valid_mask, 'ATR'] * self.stop_loss_atr_mult)
-        )
+
+        # 計算停損價（ATR基礎，2.0倍）：單一np.where取代遮罩.loc寫入
+        # （ATR或Close為NaN時算式結果本來就是NaN，只需擋掉ATR<=0）
+        df['Stop_Loss_Price'] = np.where(
+            atr > 0, close - (atr * self.stop_loss_atr_mult), np.nan)
         
         # 計算移動停損（Trailing Stop）
         # 專業邏輯：買入前的移動停損價 = 初始停損價
         # 如果已經持有且價格上漲，移動停損價可以跟隨上移（鎖定利潤）
-        df['Trailing_Stop_Price'] = df['Stop_Loss_Price'].copy()  # 默認等於初始停損價
-        
+        init_stop = df['Stop_Loss_Price'].to_numpy()
+        df['Trailing_Stop_Price'] = init_stop  # 默認等於初始停損價
+
         if len(df) > 1:
             # 計算最高價的移動窗口（用於追蹤最高點）
-            df['Highest_Close_14d'] = df['Close'].rolling(window=14, min_periods=1).max()
-            
+            highest_close_14d = _rolling_max(df['Close'], 14, min_periods=1)
+            df['Highest_Close_14d'] = highest_close_14d
+
             # 移動停損 = 最高價 - (ATR * 2.0)
-            trailing_mask = df['Highest_Close_14d'].notna() & df['ATR'].notna() & (df['ATR'] > 0) & df['Stop_Loss_Price'].notna()
-            trailing_stop_calc = df.loc[trailing_mask, 'Highest_Close_14d'] - (df.loc[trailing_mask, 'ATR'] * self.stop_loss_atr_mult)
-            
-            # 專業規則（向量化操作，提高性能）：
+            trailing_calc = highest_close_14d - (atr * self.stop_loss_atr_mult)
+
+            # 專業規則（單一融合運算，不再做遮罩.loc寫入）：
             # 1. 移動停損不能低於初始停損
             # 2. 移動停損不能高於當前價格（買入前建議）
-            # 3. 只有在移動停損 > 初始停損 且 移動停損 < 當前價 時才使用
-            condition1 = trailing_stop_calc > df.loc[trailing_mask, 'Stop_Loss_Price']  # 移動停損 > 初始停損
-            condition2 = trailing_stop_calc < df.loc[trailing_mask, 'Close']  # 移動停損 < 當前價
-            
-            # 如果兩個條件都滿足，使用計算出的移動停損；否則使用初始停損
-            valid_trailing_stop = trailing_stop_calc.where(condition1 & condition2, df.loc[trailing_mask, 'Stop_Loss_Price'])
-            df.loc[trailing_mask, 'Trailing_Stop_Price'] = valid_trailing_stop
+            # 只有兩者都滿足（且ATR有效）才採用，否則維持初始停損；
+            # 任一NaN時比較自然為False，同樣回退初始值
+            use_trailing = (trailing_calc > init_stop) & (trailing_calc < close) & (atr > 0)
+            df['Trailing_Stop_Price'] = np.where(use_trailing, trailing_calc, init_stop)
         
         # ===== 專業波段交易判斷邏輯（2-4周持有）=====
         # 核心原則：檢查更長時間的趨勢持續性和穩定性，而非只看單日或3天
         
-        # 首先：如果不滿足趨勢基礎，直接標記為「不符合」
-        df['波段狀態'] = np.where(trend_foundation, '', '不符合')
-        
-        # ===== 趨勢持續性檢查（專業標準）=====
-        # 1. 趨勢基礎持續性：最近10天至少有7天滿足趨勢基礎（70%以上）
-        trend_foundation_10d = pd.Series(False, index=df.index)
-        if len(df) >= 10:
-            for i in range(9, len(df)):
-                recent_10d_trend = trend_foundation.iloc[i-9:i+1]
-                trend_foundation_10d.iloc[i] = recent_10d_trend.sum() >= 7  # 至少7天滿足
-        
-        # 2. 均線排列穩定性：最近10天MA20>MA60的排列必須穩定
-        ma_arrangement_stable = pd.Series(False, index=df.index)
-        if len(df) >= 10:
-            for i in range(9, len(df)):
-                recent_ma20_ma60 = (df['MA20'].iloc[i-9:i+1] > df['MA60'].iloc[i-9:i+1])
-                ma_arrangement_stable.iloc[i] = recent_ma20_ma60.sum() >= 8  # 至少8天穩定排列
-        
-        # 3. 突破確認：MA5突破MA20後，至少維持3-5天以上
-        golden_cross_confirmed = pd.Series(False, index=df.index)
-        if len(df) >= 5:
-            for i in range(4, len(df)):
-                recent_5d_golden = golden_cross.iloc[i-4:i+1]
-                # 如果最近5天至少有3天滿足黃金交叉，視為確認
-                golden_cross_confirmed.iloc[i] = recent_5d_golden.sum() >= 3
-        
-        # 4. 價格突破MA20的確認：最近10天價格突破MA20的穩定性
-        price_above_ma20_stable = pd.Series(False, index=df.index)
-        if len(df) >= 10:
-            for i in range(9, len(df)):
-                recent_price_above = (df['Close'].iloc[i-9:i+1] > df['MA20'].iloc[i-9:i+1])
-                price_above_ma20_stable.iloc[i] = recent_price_above.sum() >= 7  # 至少7天在MA20之上
-        
-        # 5. 趨勢強度：最近10-20天的整體漲幅（考慮波段交易的2-4周周期）
-        trend_strength_10d = pd.Series(0.0, index=df.index)
-        trend_strength_20d = pd.Series(0.0, index=df.index)
-        if len(df) >= 20:
-            for i in range(19, len(df)):
-                if df['Close'].iloc[i-10] > 0:
-                    trend_strength_10d.iloc[i] = (df['Close'].iloc[i] - df['Close'].iloc[i-10]) / df['Close'].iloc[i-10]
-                if df['Close'].iloc[i-20] > 0:
-                    trend_strength_20d.iloc[i] = (df['Close'].iloc[i] - df['Close'].iloc[i-20]) / df['Close'].iloc[i-20]
-        
-        # 6. 成交量持續性：最近5天至少有3天成交量放大
-        volume_sustained = pd.Series(False, index=df.index)
-        if len(df) >= 5:
-            volume_above_avg = (df['Volume'] > (self.vol_multiplier * df['MA5_Vol']))
-            for i in range(4, len(df)):
-                recent_5d_vol = volume_above_avg.iloc[i-4:i+1]
-                volume_sustained.iloc[i] = recent_5d_vol.sum() >= 3  # 至少3天放量
-        
-        # 7. 短期回調檢查：最近5天是否出現明顯回調（超過3%）
-        recent_pullback = pd.Series(False, index=df.index)
-        if len(df) >= 5:
-            for i in range(4, len(df)):
-                recent_high = df['Close'].iloc[i-4:i+1].max()
-                current_price = df['Close'].iloc[i]
-                if recent_high > 0:
-                    pullback_pct = (recent_high - current_price) / recent_high
-                    recent_pullback.iloc[i] = pullback_pct > 0.03  # 回調超過3%
-        
-        # ===== 波段狀態判斷（專業標準）=====
-        valid_mask = trend_foundation & trend_foundation_10d & ma_arrangement_stable & price_above_ma20_stable
-        
-        # 1. 初升段（專業標準）：
-        #    - 趨勢基礎持續10天以上（70%時間滿足）
-        #    - 黃金交叉已確認（維持3-5天）
-        #    - 價格剛突破或接近MA20（在MA20的5%以內）
-        #    - 最近10天整體上漲
-        #    - 成交量持續放大
-        #    - 沒有明顯回調
-        initial_uptrend = (
-            valid_mask & 
-            golden_cross_confirmed & 
-            (df['Close'] <= df['MA20'] * 1.05) &
-            (trend_strength_10d > 0) &  # 最近10天上漲
-            volume_sustained &
-            ~recent_pullback
-        )
-        df.loc[initial_uptrend, '波段狀態'] = '初升段'
-        
-        # 2. 主升段（專業標準）：
-        #    - 趨勢基礎持續且穩定
-        #    - 價格遠高於MA20（>10%）
-        #    - 最近10-20天強勢上漲（漲幅>5%）
-        #    - 成交量持續放大
-        strong_uptrend = (
-            valid_mask & 
-            (df['Close'] > df['MA20'] * 1.1) &
-            (trend_strength_10d > 0.05) &  # 最近10天漲幅>5%
-            volume_sustained &
-            (df['波段狀態'] == '')  # 還沒有被其他狀態覆蓋
-        )
-        df.loc[strong_uptrend, '波段狀態'] = '主升段'
+        # 全序列都不滿足趨勢基礎時，總分必為0、波段狀態整欄必為「不符合」，
+        # 持續性檢查與狀態標註做了也不會改變任何輸出，整段直接略過
+        if trend_foundation.any():
+            # ===== 趨勢持續性檢查（專業標準）=====
+            # 滑動計數全部走_rolling_count的前綴和實作；視窗不足的前段一律False/0.0，
+            # 與原逐bar Python迴圈的預設值一致
+            # 1. 趨勢基礎持續性：最近10天至少有7天滿足趨勢基礎（70%以上）
+            trend_foundation_10d = _rolling_count(trend_foundation, 10, 7)
+
+            # 2. 均線排列穩定性：最近10天MA20>MA60的排列必須穩定（至少8天）
+            ma_arrangement_stable = _rolling_count(ma20 > ma60, 10, 8)
+
+            # 3. 突破確認：最近5天至少有3天滿足黃金交叉，視為確認
+            golden_cross_confirmed = _rolling_count(golden_cross, 5, 3)
+
+            # 4. 價格突破MA20的確認：最近10天至少7天在MA20之上
+            price_above_ma20_stable = _rolling_count(close > ma20, 10, 7)
+
+            # 5. 趨勢強度：最近10-20天的整體漲幅（考慮波段交易的2-4周周期）
+            n_bars = close.size
+            trend_strength_10d = np.zeros(n_bars)
+            if n_bars > 10:
+                trend_strength_10d[10:] = close[10:] / close[:-10] - 1
+            trend_strength_20d = np.zeros(n_bars)
+            if n_bars > 20:
+                trend_strength_20d[20:] = close[20:] / close[:-20] - 1
+
+            # 6. 成交量持續性：最近5天至少有3天成交量放大
+            volume_sustained = _rolling_count(volume > (self.vol_multiplier * ma5_vol), 5, 3)
+
+            # 7. 短期回調檢查：最近5天高點回調超過3%（NaN比較自然為False）
+            recent_high_5d = _rolling_max(df['Close'], 5)
+            recent_pullback = ((recent_high_5d - close) / recent_high_5d) > 0.03
+        
+            # ===== 波段狀態判斷（專業標準）=====
+            valid_mask = trend_foundation & trend_foundation_10d & ma_arrangement_stable & price_above_ma20_stable
+        
+            # 1. 初升段（專業標準）：
+            #    - 趨勢基礎持續10天以上（70%時間滿足）
+            #    - 黃金交叉已確認（維持3-5天）
+            #    - 價格剛突破或接近MA20（在MA20的5%以內）
+            #    - 最近10天整體上漲
+            #    - 成交量持續放大
+            #    - 沒有明顯回調
+            initial_uptrend = (
+                valid_mask & 
+                golden_cross_confirmed & 
+                (close_ma20_ratio <= 1.05) &
+                (trend_strength_10d > 0) &  # 最近10天上漲
+                volume_sustained &
+                ~recent_pullback
+            )
         
-        # 3. 拉回找買點（專業標準）：
-        #    - 趨勢基礎持續穩定
-        #    - 價格接近MA20（3%以內）
-        #    - 最近有回調（回調3-8%）
-        #    - 但趨勢基礎未破壞
-        #    - 成交量在回調時縮量
-        pullback_buy = (
-            valid_mask & 
-            price_near_ma20 & 
-            recent_pullback &  # 有回調
-            (df['波段狀態'] == '')  # 還沒有被其他狀態覆蓋
-        )
-        df.loc[pullback_buy, '波段狀態'] = '拉回找買點'
+            # 2. 主升段（專業標準）：
+            #    - 趨勢基礎持續且穩定
+            #    - 價格遠高於MA20（>10%）
+            #    - 最近10-20天強勢上漲（漲幅>5%）
+            #    - 成交量持續放大
+            strong_uptrend = (
+                valid_mask & 
+                (close_ma20_ratio > 1.1) &
+                (trend_strength_10d > 0.05) &  # 最近10天漲幅>5%
+                volume_sustained
+            )
         
-        # 4. 趨勢轉弱（專業標準）：
-        #    - 趨勢基礎仍滿足，但穩定性下降
-        #    - 最近5-10天出現連續下跌或明顯回調
-        #    - 成交量萎縮
-        trend_weakening = (
-            valid_mask & 
-            ((trend_strength_10d < -0.03) | recent_pullback) &  # 最近10天下跌超過3%或有回調
-            (df['波段狀態'] == '')  # 還沒有被其他狀態覆蓋
-        )
-        df.loc[trend_weakening, '波段狀態'] = '趨勢轉弱'
+            # 3. 拉回找買點（專業標準）：
+            #    - 趨勢基礎持續穩定
+            #    - 價格接近MA20（3%以內）
+            #    - 最近有回調（回調3-8%）
+            #    - 但趨勢基礎未破壞
+            #    - 成交量在回調時縮量
+            pullback_buy = (
+                valid_mask & 
+                price_near_ma20 & 
+                recent_pullback  # 有回調
+            )
         
-        # 5. 趨勢中（專業標準）：
-        #    - 滿足趨勢基礎且持續性良好
-        #    - 但不符合其他具體條件
-        trend_ongoing = (
-            valid_mask & 
-            (df['波段狀態'] == '')  # 還沒有被其他狀態覆蓋
-        )
-        df.loc[trend_ongoing, '波段狀態'] = '趨勢中'
+            # 4. 趨勢轉弱（專業標準）：
+            #    - 趨勢基礎仍滿足，但穩定性下降
+            #    - 最近5-10天出現連續下跌或明顯回調
+            #    - 成交量萎縮
+            trend_weakening = (
+                valid_mask & 
+                ((trend_strength_10d < -0.03) | recent_pullback)  # 最近10天下跌超過3%或有回調
+            )
         
+            # 5. 趨勢中（專業標準）：
+            #    - 滿足趨勢基礎且持續性良好
+            #    - 但不符合其他具體條件（valid_mask兜底）
+
+            # 狀態有優先序且互斥：np.select按先到先得一趟解碼整欄，
+            # 取代五次遮罩.loc寫入與四次「還沒被覆蓋」的整欄重掃
+            df['波段狀態'] = pd.Categorical(np.select(
+                [initial_uptrend, strong_uptrend, pullback_buy,
+                 trend_weakening, valid_mask, trend_foundation],
+                ['初升段', '主升段', '拉回找買點', '趨勢轉弱', '趨勢中', ''],
+                default='不符合'), categories=_SWING_STATES)
+        else:
+            # 沒有任何bar滿足趨勢基礎：整欄都是「不符合」
+            df['波段狀態'] = pd.Categorical(
+                ['不符合'] * len(df), categories=_SWING_STATES)
+
         # 建議持有天數（基於MA60趨勢強度）
         # 如果MA60向上且角度陡，建議持有更久
         if len(df) >= 60:
-            ma60_slope = (df['MA60'].iloc[-1] - df['MA60'].iloc[-20]) / df['MA60'].iloc[-20] if df['MA60'].iloc[-20] > 0 else 0
+            ma60_start = ma60[-20]
+            ma60_slope = (ma60[-1] - ma60_start) / ma60_start if ma60_start > 0 else 0.0
             # 斜率 > 5%: 28天, > 3%: 21天, > 1%: 14天, else: 7天
-            df['建議持有天數'] = np.where(
-                ma60_slope > 0.05, 28,
-                np.where(ma60_slope > 0.03, 21,
-                np.where(ma60_slope > 0.01, 14, 7))
-            )
+            # 斜率本來就是單一純量：直接分級後讓pandas廣播，
+            # 不再對整條序列跑3層np.where
+            if ma60_slope > 0.05:
+                holding_days = 28
+            elif ma60_slope > 0.03:
+                holding_days = 21
+            elif ma60_slope > 0.01:
+                holding_days = 14
+            else:
+                holding_days = 7
+            df['建議持有天數'] = holding_days
         else:
             df['建議持有天數'] = 14  # 默認14天
         
         return df
     
-    def scan_stocks(self, stock_list: List[str], 
+    # 買入訊號查表：[新規則觸發][波段狀態屬弱勢][分數桶] → 訊號
+    # 分數桶：無分/(0,50)/[50,70)/70以上；未觸發新規則時一律最高「觀察」，
+    # 觸發但處於趨勢中/趨勢轉弱時高分降級為「買入」
+    _SIGNAL_TABLE = (
+        (('無信號', '觀察', '觀察', '觀察'),
+         ('無信號', '觀察', '觀察', '觀察')),
+        (('無信號', '觀察', '買入', '強買入'),
+         ('無信號', '觀察', '觀察', '買入')),
+    )
+
+    # 結果表中以float32儲存的數值欄（見scan_stocks的組表階段）
+    _FLOAT32_RESULT_COLS = (
+        '當前股價', '前一日股價', '策略評分', '建議停損價(ATR)',
+        '移動停損價', '建議停利價', 'MA5', 'MA20', 'MA50', 'MA60', 'MA200',
+        'ATR', 'Trend_Score', 'Momentum_Score', 'RS_Score',
+    )
+
+    @staticmethod
+    def _result_row(sector: str, stock_id: str, stock_name: str, **overrides) -> dict:
+        """組一筆固定schema的掃描結果列
+
+        流動性不足/無數據/正常評分三種情境共用同一欄位集合，
+        pd.DataFrame(results)組表時欄位對齊、不必為缺漏鍵補洞。
+
+        Parameters:
+        -----------
+        sector : str
+            族群分類
+        stock_id : str
+            股票代號
+        stock_name : str
+            股票名稱
+        **overrides
+            要覆寫預設值的欄位
+
+        Returns:
+        --------
+        dict: 完整schema的結果列
+        """
+        row = {
+            '族群': sector,
+            '股票代碼': stock_id,
+            '股票名稱': stock_name,
+            '當前股價': np.nan,
+            '前一日股價': np.nan,
+            '策略評分': 0.0,
+            '買入訊號': '無信號',
+            '建議停損價(ATR)': np.nan,
+            '移動停損價': np.nan,
+            '建議停利價': np.nan,
+            '數據日期': '',
+            '波段狀態': '無數據',
+            '建議持有天數': 0,
+            'MA5': np.nan,
+            'MA20': np.nan,
+            'MA50': np.nan,
+            'MA60': np.nan,
+            'MA200': np.nan,
+            'Date': None,
+            'Volume': np.nan,
+            'ATR': np.nan,
+            'Trend_Score': 0.0,
+            'Momentum_Score': 0.0,
+            'RS_Score': 0.0,
+        }
+        row.update(overrides)
+        return row
+
+    def scan_stocks(self, stock_list: List[str],
                    progress_callback=None) -> pd.DataFrame:
         """
         掃描股票列表
@@ -1025,18 +1456,113 @@ class TaiwanStockScanner:
         pd.DataFrame
             符合條件的股票結果（按分數排序）
         """
-        results = []
+        # 每支股票最多產出一列：先按清單長度配好list，用游標寫入，
+        # 避免append路徑的多次倍增重配，結尾再裁到實際筆數
         total = len(stock_list)
-        
+        results = [None] * total
+        result_count = 0
+        # 同一輪掃描絕大多數股票的最後交易日相同：
+        # strftime格式化結果按時間戳快取，整輪通常只需格式化一次
+        date_str_cache = {}
+        # 掃描失敗的代號先入緩衝，迴圈結束後一次輸出（熱迴圈內不逐筆flush）
+        scan_errors = []
+
+        # 類別層查表hoist成區域變數：迴圈內每個欄位省一次屬性解析＋dict查找
+        tickers_map = self.DEFAULT_TICKERS
+        names_map = self.STOCK_NAMES
+
+        # 新一輪掃描：清掉上一輪的基準變化率快取（基準frame已換新）
+        self._bench_pct_cache.clear()
+
+        # 先併發抓取所有數據：每支股票與基準指數各是一次yfinance HTTP往返，
+        # 逐支序列等待時總耗時約為N×RTT，改用執行緒池同時發出全部請求
+        # （I/O-bound，用執行緒而非行程即可）
+        fetched = {}
+        benchmarks = {}
+        if stock_list:
+            # 台股共用^TWII、美股共用^GSPC，每種基準只需抓一次
+            benchmark_keys = {
+                stock_id: (self.benchmark_ticker_tw
+                           if ('.TW' in stock_id or '.TWO' in stock_id)
+                           else self.benchmark_ticker_us)
+                for stock_id in stock_list
+            }
+            bench_rep = {}
+            for stock_id in stock_list:
+                bench_rep.setdefault(benchmark_keys[stock_id], stock_id)
+
+            # 當日快取命中的代號直接取用，剩下的才進批次請求
+            for stock_id in stock_list:
+                cached = self._load_cached(f"{stock_id}_2y")
+                if cached is not None:
+                    fetched[stock_id] = (cached, 2, None)
+                    print(f"📦 {stock_id}: 使用當日磁碟快取，共 {len(cached)} 筆")
+            for bench_key in bench_rep:
+                cached = self._load_cached(f"{bench_key}_2y")
+                if cached is not None:
+                    benchmarks[bench_key] = cached
+
+            # 把剩餘的掃描清單（含基準指數）收斂成單一批次請求
+            batch_symbols = [
+                symbol for symbol in dict.fromkeys(list(stock_list) + list(bench_rep))
+                if symbol not in fetched and symbol not in benchmarks
+            ]
+            batch_data = self._fetch_batch(batch_symbols, years=2)
+            for stock_id in stock_list:
+                if stock_id in fetched:
+                    continue
+                batch_df = batch_data.get(stock_id)
+                if batch_df is not None and len(batch_df) >= 60:
+                    fetched[stock_id] = (batch_df, 2, None)
+                    self._save_cache(f"{stock_id}_2y", batch_df)
+            for bench_key in bench_rep:
+                if bench_key in benchmarks:
+                    continue
+                bench_df = batch_data.get(bench_key)
+                if bench_df is not None and not bench_df.empty:
+                    bench_df = bench_df[['Close']].rename(
+                        columns={'Close': 'Benchmark_Close'})
+                    benchmarks[bench_key] = bench_df
+                    self._save_cache(f"{bench_key}_2y", bench_df)
+            if batch_data:
+                print(f"✅ 批次抓取成功 {len(batch_data)}/{len(batch_symbols)} 個代號")
+
+            # 批次漏掉的代號退回逐檔抓取（保留.TW→.TWO切換等回退邏輯）
+            missing_stocks = [s for s in stock_list if s not in fetched]
+            missing_bench = {k: v for k, v in bench_rep.items() if k not in benchmarks}
+            if missing_stocks or missing_bench:
+                max_workers = min(16, max(1, len(missing_stocks) + len(missing_bench)))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    bench_futures = {
+                        bench_key: executor.submit(self.fetch_benchmark_data, 2, rep_id)
+                        for bench_key, rep_id in missing_bench.items()
+                    }
+                    stock_futures = {
+                        executor.submit(self.fetch_stock_data, stock_id, 2, True): stock_id
+                        for stock_id in missing_stocks
+                    }
+                    for future in as_completed(stock_futures):
+                        stock_id = stock_futures[future]
+                        try:
+                            fetched[stock_id] = future.result()
+                        except Exception as e:
+                            fetched[stock_id] = (None, 0, f"{stock_id}: 併發抓取失敗 - {str(e)}")
+                    for bench_key, future in bench_futures.items():
+                        try:
+                            benchmarks[bench_key] = future.result()
+                        except Exception as e:
+                            print(f"獲取基準數據失敗: {str(e)}")
+                            benchmarks[bench_key] = None
+
         for i, stock_id in enumerate(stock_list):
-            # 為每支股票獲取對應的基準數據（台股用^TWII，美股用^GSPC）
-            benchmark_df = self.fetch_benchmark_data(years=2, stock_id=stock_id)
+            # 為每支股票取用對應的基準數據（台股用^TWII，美股用^GSPC）
+            benchmark_df = benchmarks.get(benchmark_keys[stock_id])
             try:
                 if progress_callback:
                     progress_callback(i + 1, total, stock_id)
                 
                 # 獲取族群分類（如果在預設列表中，使用預設分類；否則使用"其他"）
-                sector = self.DEFAULT_TICKERS.get(stock_id, '其他')
+                sector = tickers_map.get(stock_id, '其他')
                 
                 # 檢查市場環境（僅在第一次掃描時檢查，用於顯示警告）
                 # 注意：用戶已確認只會在多頭市場使用，但我們還是繼續掃描並顯示警告
@@ -1048,8 +1574,8 @@ class TaiwanStockScanner:
                 # 注意：系統會自動處理上櫃股票（如果.TW找不到，會自動嘗試.TWO）
                 # 波段交易需要至少60個交易日（用於計算MA60和基本指標）
                 # 使用2年數據以準確計算MA200（需要至少200個交易日）
-                # fetch_stock_data現在返回 (df, actual_years, error_msg)
-                df, actual_data_years, fetch_error = self.fetch_stock_data(stock_id, years=2, allow_fallback=True)
+                # fetch_stock_data現在返回 (df, actual_years, error_msg)，已在上方併發預抓
+                df, actual_data_years, fetch_error = fetched.get(stock_id, (None, 0, '未取得數據'))
                 
                 # 記錄數據年份（用於判斷MA200是否可用）
                 can_calculate_ma200 = actual_data_years >= 2 and df is not None and len(df) >= 200
@@ -1062,24 +1588,14 @@ class TaiwanStockScanner:
                 if df is not None and len(df) >= 20:
                     if not self.check_liquidity(df):
                         # 流動性不足，跳過
-                        stock_name = self.STOCK_NAMES.get(stock_id, stock_id)
-                        results.append({
-                            '族群': sector,
-                            '股票代碼': stock_id,
-                            '股票名稱': stock_name,
-                            '當前股價': np.nan,
-                            '策略評分': 0.0,
-                            '買入訊號': '流動性不足',
-                            '建議停損價(ATR)': np.nan,
-                            '移動停損價': np.nan,
-                            '建議停利價': np.nan,
-                            '數據日期': '流動性不足',
-                            '波段狀態': '流動性不足',
-                            '建議持有天數': 0,
-                            'MA5': np.nan,
-                            'MA20': np.nan,
-                            'MA60': np.nan,
-                        })
+                        stock_name = names_map.get(stock_id, stock_id)
+                        results[result_count] = self._result_row(
+                            sector, stock_id, stock_name,
+                            買入訊號='流動性不足',
+                            數據日期='流動性不足',
+                            波段狀態='流動性不足',
+                        )
+                        result_count += 1
                         continue
                 
                 # 暫時禁用基本面檢查（讓技術指標優先顯示）
@@ -1091,103 +1607,85 @@ class TaiwanStockScanner:
                 #     fundamental_warning = fundamental_reason
                 
                 if df is None or len(df) < 60:  # 至少需要60個交易日才能計算MA60和基本指標
+                    # 即使無法獲取數據，也顯示在結果中（標記為無數據）
                     # fetch_stock_data已經在內部處理了.TWO的切換，這裡不需要重複處理
-                    pass
-                    
-                    if df is None or len(df) < 60:
-                        # 即使無法獲取數據，也顯示在結果中（標記為無數據）
-                        stock_name = self.STOCK_NAMES.get(stock_id, stock_id)
+                    stock_name = names_map.get(stock_id, stock_id)
                     # 如果.TWO沒有在STOCK_NAMES中，嘗試.TW的映射
                     if stock_id.endswith('.TWO') and stock_name == stock_id:
                         tw_version = stock_id.replace('.TWO', '.TW')
-                        stock_name = self.STOCK_NAMES.get(tw_version, stock_id)
-                        # 如果.TWO有數據但STOCK_NAMES沒有，嘗試.TW的映射
-                        if stock_id.endswith('.TWO') and stock_name == stock_id:
-                            tw_version = stock_id.replace('.TWO', '.TW')
-                            stock_name = self.STOCK_NAMES.get(tw_version, stock_id)
-                    
+                        stock_name = names_map.get(tw_version, stock_id)
+
                     # 檢查錯誤原因（使用fetch_error中的詳細訊息）
-                    error_msg = fetch_error if fetch_error else '無法獲取'
                     if df is None:
                         error_msg = fetch_error if fetch_error else 'Yahoo Finance未找到'
-                    elif len(df) < 60:
+                    else:
                         error_msg = f'數據不足（僅{len(df)}筆，需要至少60筆）'
                     
-                    results.append({
-                        '族群': sector,
-                        '股票代碼': stock_id,
-                        '股票名稱': stock_name,
-                        '當前股價': np.nan,
-                        '策略評分': 0.0,
-                        '買入訊號': '無數據',
-                        '建議停損價(ATR)': np.nan,
-                        '移動停損價': np.nan,
-                        '建議停利價': np.nan,
-                        '數據日期': error_msg,
-                        '波段狀態': '無數據',
-                        '建議持有天數': 0,
-                        'MA5': np.nan,
-                        'MA20': np.nan,
-                        'MA60': np.nan,
-                        'Date': None,
-                        'Volume': np.nan,
-                        'ATR': np.nan,
-                        'Trend_Score': 0.0,
-                        'Momentum_Score': 0.0,
-                        'RS_Score': 0.0,
-                    })
+                    results[result_count] = self._result_row(
+                        sector, stock_id, stock_name,
+                        買入訊號='無數據',
+                        數據日期=error_msg,
+                        波段狀態='無數據',
+                    )
+                    result_count += 1
                     continue
                 
                 # 計算評分（波段交易邏輯）
-                scored_df = self.calculate_scores(df, benchmark_df)
+                # 指標計算是最可能因異常數據出錯的一段，就近捕捉明確的
+                # 例外型別標記該檔後續掃，不再靠外層的廣域守門吞掉堆疊資訊
+                try:
+                    scored_df = self.calculate_scores(df, benchmark_df)
+                except (KeyError, IndexError, ValueError) as e:
+                    print(f"⚠️ {stock_id}: 指標計算失敗 - {str(e)}")
+                    stock_name = names_map.get(stock_id, stock_id)
+                    results[result_count] = self._result_row(
+                        sector, stock_id, stock_name,
+                        買入訊號='Data Error',
+                        數據日期='Data Error',
+                        波段狀態='Data Error',
+                    )
+                    result_count += 1
+                    continue
                 
                 # 獲取最新數據（最後一個交易日）
                 latest = scored_df.iloc[-1]
                 
                 # 數據驗證：檢查是否有數據錯誤
                 if latest.get('Data_Error', False) or pd.isna(latest['Close']):
-                    stock_name = self.STOCK_NAMES.get(stock_id, stock_id)
+                    stock_name = names_map.get(stock_id, stock_id)
                     # 如果.TWO沒有在STOCK_NAMES中，嘗試.TW的映射
                     if stock_id.endswith('.TWO') and stock_name == stock_id:
                         tw_version = stock_id.replace('.TWO', '.TW')
-                        stock_name = self.STOCK_NAMES.get(tw_version, stock_id)
-                    results.append({
-                        '族群': sector,
-                        '股票代碼': stock_id,
-                        '股票名稱': stock_name,
-                        '當前股價': np.nan,
-                        '策略評分': 0.0,
-                        '買入訊號': 'Data Error',
-                        '建議停損價(ATR)': np.nan,
-                        '移動停損價': np.nan,
-                        '建議停利價': np.nan,
-                        '數據日期': 'Data Error',
-                        '波段狀態': 'Data Error',
-                        '建議持有天數': 0,
-                        'MA5': np.nan,
-                        'MA20': np.nan,
-                        'MA60': np.nan,
-                        'Date': None,
-                        'Volume': np.nan,
-                        'ATR': np.nan,
-                        'Trend_Score': 0.0,
-                        'Momentum_Score': 0.0,
-                        'RS_Score': 0.0,
-                    })
+                        stock_name = names_map.get(tw_version, stock_id)
+                    results[result_count] = self._result_row(
+                        sector, stock_id, stock_name,
+                        買入訊號='Data Error',
+                        數據日期='Data Error',
+                        波段狀態='Data Error',
+                    )
+                    result_count += 1
                     continue
                 
                 # 當前價格 = 最新的Close價格（確保是最新數據）
                 current_price = latest['Close']
-                
+
+                # 每個欄位只做一次標籤查找：訊號判斷階梯與結果組裝會重複
+                # 讀Total_Score／ATR等欄位，先取成區域純量
+                total_score = latest['Total_Score']
+                atr_value = latest['ATR']
+                stop_loss_price = latest['Stop_Loss_Price']
+
+
                 # 獲取前一日價格（用於判斷漲跌顏色）
+                # 從Close單欄取純量即可，不必用iloc[-2]複製整列Series
                 prev_price = np.nan
                 if len(scored_df) > 1:
-                    prev_price = scored_df.iloc[-2]['Close']  # 前一個交易日的收盤價
+                    prev_price = scored_df['Close'].iloc[-2]  # 前一個交易日的收盤價
                 
                 # 計算建議停利價（買入價 + 2*ATR）
                 take_profit_price = np.nan
-                if pd.notna(current_price) and pd.notna(latest['ATR']) and latest['ATR'] > 0:
-                    take_profit_price = current_price + (latest['ATR'] * 2)
+                if pd.notna(current_price) and pd.notna(atr_value) and atr_value > 0:
+                    take_profit_price = current_price + (atr_value * 2)
                 
                 # 買入訊號（波段交易邏輯）- 結合策略評分、波段狀態和新規則
                 swing_status = latest.get('波段狀態', '不符合')
@@ -1197,63 +1695,41 @@ class TaiwanStockScanner:
                 pullback_20pct = latest.get('觀察條件_回檔20%', False)
                 
                 # 優先級：新規則 > 原有規則
-                # 如果新進場觸發條件不滿足，即使其他條件滿足，也只能是「觀察」或「無信號」
-                if not new_entry_trigger:
-                    # 新規則不滿足，最高只給「觀察」
-                    if latest['Total_Score'] >= 70 and swing_status in ['初升段', '主升段', '拉回找買點']:
-                        signal = '觀察'  # 原有規則滿足但新規則不滿足
-                    elif latest['Total_Score'] >= 50:
-                        signal = '觀察'
-                    elif latest['Total_Score'] > 0:
-                        signal = '觀察'
-                    else:
-                        signal = '無信號'
-                else:
-                    # 新規則滿足，再結合原有規則判斷
-                    if swing_status in ['趨勢中', '趨勢轉弱']:
-                        # 新規則滿足但波段狀態不佳，降級處理
-                        if latest['Total_Score'] >= 70:
-                            signal = '買入'  # 降級：趨勢中/趨勢轉弱時，最高只給「買入」
-                        elif latest['Total_Score'] >= 50:
-                            signal = '觀察'
-                        elif latest['Total_Score'] > 0:
-                            signal = '觀察'
-                        else:
-                            signal = '無信號'
-                    else:
-                        # 新規則滿足且波段狀態良好，按總分判斷
-                        if latest['Total_Score'] >= 70:
-                            signal = '強買入'
-                        elif latest['Total_Score'] >= 50:
-                            signal = '買入'
-                        elif latest['Total_Score'] > 0:
-                            signal = '觀察'
-                        else:
-                            signal = '無信號'
+                # 原本的三層if/elif階梯改為查表：分數分桶、狀態強弱、
+                # 新規則觸發與否三個座標一次解碼（各組合結果與原階梯一致）
+                score_bucket = (int(total_score > 0) + int(total_score >= 50)
+                                + int(total_score >= 70))
+                weak_state = 1 if swing_status in ('趨勢中', '趨勢轉弱') else 0
+                signal = self._SIGNAL_TABLE[int(bool(new_entry_trigger))][weak_state][score_bucket]
                 
                 # 獲取數據日期（最新交易日）
                 data_date = latest.name
-                if isinstance(data_date, pd.Timestamp):
-                    # 處理時區問題
-                    if hasattr(data_date, 'tz') and data_date.tz is not None:
-                        data_date = data_date.tz_localize(None)
-                    data_date_str = data_date.strftime('%Y-%m-%d')
-                else:
-                    data_date_str = str(data_date)[:10]
+                data_date_str = date_str_cache.get(data_date)
+                if data_date_str is None:
+                    if isinstance(data_date, pd.Timestamp):
+                        # 處理時區問題
+                        if hasattr(data_date, 'tz') and data_date.tz is not None:
+                            data_date = data_date.tz_localize(None)
+                        data_date_str = data_date.strftime('%Y-%m-%d')
+                    else:
+                        data_date_str = str(data_date)[:10]
+                    date_str_cache[latest.name] = data_date_str
                 
                 # 獲取股票名稱（處理.TWO的情況）
-                stock_name = self.STOCK_NAMES.get(stock_id, None)
+                stock_name = names_map.get(stock_id, None)
                 # 如果.TWO沒有在STOCK_NAMES中，嘗試.TW的映射
                 if stock_name is None or stock_name == stock_id:
                     if stock_id.endswith('.TWO'):
                         tw_version = stock_id.replace('.TWO', '.TW')
-                        stock_name = self.STOCK_NAMES.get(tw_version, None)
+                        stock_name = names_map.get(tw_version, None)
                 
-                # 如果還是沒有，嘗試從yfinance自動獲取股票名稱
+                # 如果還是沒有，先查名稱磁碟快取（名稱幾乎不會變，
+                # 跨session持久化），沒有才從yfinance自動獲取
+                if stock_name is None or stock_name == stock_id:
+                    stock_name = self._name_cache.get(stock_id)
                 if stock_name is None or stock_name == stock_id:
                     try:
-                        ticker = yf.Ticker(stock_id)
-                        info = ticker.info
+                        info = self._get_ticker_info(stock_id)
                         # 嘗試獲取中文名稱或英文名稱
                         if 'longName' in info and info['longName']:
                             stock_name = info['longName']
@@ -1263,6 +1739,10 @@ class TaiwanStockScanner:
                             stock_name = stock_id  # 如果都獲取不到，使用股票代碼
                     except:
                         stock_name = stock_id  # 如果獲取失敗，使用股票代碼
+                    # 解析成功就寫入名稱快取，之後的session不再為名稱打API
+                    if stock_name != stock_id:
+                        self._name_cache[stock_id] = stock_name
+                        self._save_name_cache()
                 
                 # 波段狀態和建議持有天數
                 swing_status = latest.get('波段狀態', '不符合')
@@ -1279,54 +1759,73 @@ class TaiwanStockScanner:
                 if fundamental_warning:
                     data_date_final = f"{data_date_str} (⚠️{fundamental_warning})"
                 
-                # 移動停損價
-                trailing_stop = latest.get('Trailing_Stop_Price', latest['Stop_Loss_Price'])
-                
-                # 獲取前一日股價（用於顏色判斷）
-                prev_price = np.nan
-                if len(scored_df) >= 2:
-                    prev_price = scored_df.iloc[-2]['Close']  # 前一個交易日的收盤價
+                # 移動停損價（calculate_scores保證整欄存在：預設即為初始停損，
+                # 僅在移動停損更有利時覆寫，這裡不再需要.get的逐列回退分支）
+                trailing_stop = latest['Trailing_Stop_Price']
                 
                 # 使用正確的列名（波段交易專用）
-                results.append({
-                    '族群': sector,
-                    '股票代碼': stock_id,
-                    '股票名稱': stock_name,
-                    '當前股價': current_price,  # 確保是最新的Close價格
-                    '前一日股價': prev_price,  # 前一日收盤價（用於顏色判斷）
-                    '策略評分': latest['Total_Score'],
-                    '買入訊號': signal,
-                    '建議停損價(ATR)': latest['Stop_Loss_Price'],
-                    '移動停損價': trailing_stop,
-                    '建議停利價': take_profit_price,
-                    '數據日期': data_date_final,  # 包含基本面警告（如果有）
-                    '波段狀態': swing_status,
-                    '建議持有天數': holding_days,
-                    'MA5': latest.get('MA5', np.nan),
-                    'MA20': latest['MA20'],
-                    'MA50': latest.get('MA50', np.nan),  # 中期均線（長期趨勢確認）
-                    'MA60': latest['MA60'],
-                    'MA200': latest.get('MA200', np.nan) if can_calculate_ma200 else np.nan,  # 超長期均線（如果數據足夠則計算）
+                results[result_count] = self._result_row(
+                    sector, stock_id, stock_name,
+                    當前股價=current_price,  # 確保是最新的Close價格
+                    前一日股價=prev_price,  # 前一日收盤價（用於顏色判斷）
+                    策略評分=total_score,
+                    買入訊號=signal,
+                    移動停損價=trailing_stop,
+                    建議停利價=take_profit_price,
+                    數據日期=data_date_final,  # 包含基本面警告（如果有）
+                    波段狀態=swing_status,
+                    建議持有天數=holding_days,
+                    MA5=latest.get('MA5', np.nan),
+                    MA20=latest['MA20'],
+                    MA50=latest.get('MA50', np.nan),  # 中期均線（長期趨勢確認）
+                    MA60=latest['MA60'],
+                    MA200=latest.get('MA200', np.nan) if can_calculate_ma200 else np.nan,  # 超長期均線（如果數據足夠則計算）
                     # 保留其他欄位用於內部處理
-                    'Date': latest.name,
-                    'Volume': latest['Volume'],
-                    'ATR': latest['ATR'],
-                    'Trend_Score': latest['Trend_Score'],
-                    'Momentum_Score': latest['Momentum_Score'],
-                    'RS_Score': latest['RS_Score'],
-                })
+                    Date=latest.name,
+                    Volume=latest['Volume'],
+                    ATR=atr_value,
+                    Trend_Score=latest['Trend_Score'],
+                    Momentum_Score=latest['Momentum_Score'],
+                    RS_Score=latest['RS_Score'],
+                    **{'建議停損價(ATR)': stop_loss_price},
+                )
+                result_count += 1
                     
             except Exception as e:
-                print(f"掃描 {stock_id} 時發生錯誤: {str(e)}")
+                scan_errors.append((stock_id, str(e)))
                 continue
-        
-        if not results:
+
+        if scan_errors:
+            print(f"⚠️ 共 {len(scan_errors)} 支股票掃描時發生錯誤：")
+            for err_stock_id, err_msg in scan_errors[:10]:
+                print(f"  - {err_stock_id}: {err_msg}")
+            if len(scan_errors) > 10:
+                print(f"  ...（其餘 {len(scan_errors) - 10} 支省略）")
+
+        if result_count == 0:
             return pd.DataFrame()
-        
-        result_df = pd.DataFrame(results)
-        
-        # 按策略評分排序（降序）
-        result_df = result_df.sort_values('策略評分', ascending=False).reset_index(drop=True)
-        
+        results = results[:result_count]
+
+        # _result_row保證每列schema一致，先轉置成欄dict再一次組表：
+        # 免去pd.DataFrame(list of dicts)逐列掃描鍵集合的推斷成本
+        columns = {col: [row[col] for row in results] for col in results[0]}
+        # 族群只有少數幾個不同值，改存category：整欄共用字串表，
+        # 之後按族群篩選/分組也比object欄快（股票名稱幾乎逐列不同，不值得轉）
+        columns['族群'] = pd.Categorical(columns['族群'])
+        # 價格/均線/評分用float32已綽綽有餘（顯示只取到小數兩位），
+        # 整表記憶體減半；成交量維持float64以免大單量超出float32精度
+        for col in self._FLOAT32_RESULT_COLS:
+            columns[col] = np.asarray(columns[col], dtype=np.float32)
+        # 成交量也直接給定型別（無數據列為NaN，須用浮點數承載），
+        # pandas組表時整欄免去逐值型別推斷
+        columns['Volume'] = np.asarray(columns['Volume'], dtype=np.float64)
+        result_df = pd.DataFrame(columns)
+
+        # 按策略評分排序（降序）：排序鍵只有單一浮點欄，argsort算出
+        # 排列後整表take一次，不走sort_values的泛用排序機制
+        order = np.argsort(result_df['策略評分'].to_numpy(), kind='stable')[::-1]
+        result_df = result_df.take(order)
+        result_df.index = pd.RangeIndex(len(result_df))
+
         return result_df
 